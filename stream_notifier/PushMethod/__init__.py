@@ -1,38 +1,64 @@
-from typing import Optional
+import asyncio
+import time
+from typing import Literal, Optional
 
 from loguru import logger
+from pydantic import validate_call
 
-from stream_notifier.model import BaseModel, from_mapping
+from stream_notifier.metrics import PUSH_DURATION, PUSH_FAILURES
+from stream_notifier.model import BaseModel
+from stream_notifier.timing import startup_timer
 
-from .discord_push import DiscordPush
+from .dispatch import DispatchQueue
 from .task import PushTask
-from .telegram_push import TelegramPush
-from .twitter_push import TwitterPush
 
-_push_methods = {
-    "discord": DiscordPush,
-    "telegram": TelegramPush,
-    "twitter": TwitterPush,
-}
+PushMethodType = Literal["discord", "telegram", "twitter"]
+
+
+@validate_call
+def import_push_method(method_type: PushMethodType):
+    # Only import the client libraries of the push methods in use
+    base = "".join(word.capitalize() for word in method_type.split("_"))
+    module = startup_timer.import_module(f".{method_type}_push", __name__)
+    return getattr(module, f"{base}Push")
 
 
 class PushMethodGeneralConfig(BaseModel):
-    type: from_mapping(_push_methods)
+    type: PushMethodType
     comment: Optional[str] = None
+    # Seconds before a push to this destination is abandoned
+    timeout: Optional[float] = 60
+    # Messages per second sent to this destination, and how many may be sent at once
+    rate: Optional[float] = None
+    burst: int = 1
 
 
 class Push:
-    def __init__(self, push_methods: dict[str, dict], test_mode=False):
+    def __init__(
+        self, push_methods: dict[str, dict], test_mode=False, max_concurrency=8
+    ):
         self.methods = {}
         self.comments = {}
+        self.timeouts = {}
+        self.queues = {}
         self.test_mode = test_mode
+        self.semaphore = asyncio.Semaphore(max_concurrency)
 
         for name, config in push_methods.items():
             # Look up the push module by "type" field
             push_config = PushMethodGeneralConfig.model_validate(config)
-            instance = push_config.type(config)
+            push_cls = import_push_method(push_config.type)
+            instance = push_cls(config)
             self.methods[name] = instance
-            self.comments[name] = push_config.comment or push_config.type.__name__
+            self.comments[name] = push_config.comment or push_cls.__name__
+            self.timeouts[name] = push_config.timeout
+            self.queues[name] = DispatchQueue(
+                name,
+                instance,
+                push_config.rate,
+                push_config.burst,
+                timeout=push_config.timeout,
+            )
 
     async def verify_push(self):
         for name, instance in self.methods.items():
@@ -50,46 +76,92 @@ class Push:
         if self.test_mode:
             logger.warning("Test mode enabled, will not push to platforms")
 
-        for task in self.iter_push_tasks(push_contents, context, **kwargs):
-            logger.info(
-                "Pushing for {} ({})",
-                task.name,
-                task.comment,
-            )
+        errors = []
+        tasks = self.iter_push_tasks(push_contents, context, errors, **kwargs)
+        await asyncio.gather(*(self.send_task(task) for task in tasks))
 
-            try:
-                await task.send()
-            except Exception:
-                logger.exception("Push failed for {}!", task.name)
+        # Destinations with a broken template must not hold back the others
+        if errors:
+            raise errors[0]
 
-    def iter_push_tasks(self, push_contents: dict[str, str], context, **kwargs):
+    async def send_task(self, task: PushTask, raise_errors=False):
+        # The timeout counts from now, time spent waiting in the queue included
+        deadline = None if task.timeout is None else time.monotonic() + task.timeout
+
+        async def job():
+            async with self.semaphore:
+                logger.info(
+                    "Pushing for {} ({})",
+                    task.name,
+                    task.comment,
+                )
+                remaining = None if deadline is None else deadline - time.monotonic()
+                started = time.perf_counter()
+                try:
+                    await asyncio.wait_for(task.send(), remaining)
+                finally:
+                    PUSH_DURATION.observe(
+                        time.perf_counter() - started, destination=task.name
+                    )
+
+        try:
+            # Waits for its turn behind other pushes to the same destination
+            await asyncio.wait_for(self.queues[task.name].push(job), task.timeout)
+        except asyncio.TimeoutError:
+            PUSH_FAILURES.inc(destination=task.name, reason="timeout")
+            logger.error(
+                "Push timed out for {} after {} seconds!", task.name, task.timeout
+            )
+            if raise_errors:
+                raise
+        except Exception:
+            PUSH_FAILURES.inc(destination=task.name, reason="error")
+            logger.exception("Push failed for {}!", task.name)
+            if raise_errors:
+                raise
+
+    def create_task(self, name: str, text: str, context=None, skip=()) -> PushTask:
+        return PushTask(
+            name,
+            self.comments[name],
+            self.methods[name],
+            text,
+            context,
+            self.test_mode,
+            timeout=self.timeouts[name],
+            skip=skip,
+        )
+
+    def iter_push_tasks(
+        self, push_contents: dict[str, str], context, errors=None, **kwargs
+    ):
         for name, content in push_contents.items():
-            text = content.format(**kwargs)
             try:
-                module = self.methods[name]
-                comment = self.comments[name]
-            except KeyError:
+                text = content.format(**kwargs)
+            except Exception as e:
+                if errors is None:
+                    raise
+                logger.error("Failed to format push content for {}: {!r}", name, e)
+                errors.append(e)
+                continue
+
+            if name not in self.methods:
                 logger.warning("Push method {} is not configured! Skipping.", name)
                 continue
 
-            yield PushTask(name, comment, module, text, context, self.test_mode)
+            yield self.create_task(name, text, context)
+
+    async def send_report(self, report_methods, source=None, **kwargs):
+        """Queue a report, sent after any pending pushes to the same destination."""
 
-    async def send_report(self, report_methods, **kwargs):
         for name in report_methods:
-            try:
-                module = self.methods[name]
-            except KeyError:
+            if name not in self.methods:
                 logger.warning("Push method {} is not configured! Skipping.", name)
                 continue
 
-            logger.info("Sending report for {}", type(module).__name__)
-            params = kwargs
-
-            try:
-                await module.report(**params)
-            except Exception:
-                logger.exception("Report failed for {}!", name)
+            self.queues[name].report(source, **kwargs)
 
     async def close(self):
+        await asyncio.gather(*(queue.close() for queue in self.queues.values()))
         for method in self.methods.values():
             await method.close()
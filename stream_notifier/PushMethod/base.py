@@ -4,6 +4,17 @@ Unnecessary dummy ABC
 from typing import Union
 
 
+class PartialPushError(Exception):
+    """Some targets of a push method, such as webhooks or chats, failed.
+
+    done lists the targets that got the message, so a retry can skip them."""
+
+    def __init__(self, done: list, errors: list[Exception]):
+        super().__init__(f"{len(errors)} target(s) failed, first error: {errors[0]!r}")
+        self.done = list(done)
+        self.errors = errors
+
+
 # This is unnecessary, but for fun
 class Push:
     """ABC for all push methods"""
@@ -11,10 +22,11 @@ class Push:
     async def verify(self):
         pass
 
-    async def send(self, content: str, context):
+    async def send(self, content: str, context, skip=()):
         """Formats text with contents and sends to respective platforms.
 
-        Additional formatting variables can be provided as keyword arguments."""
+        Targets in skip already got the message in an earlier attempt. Raises
+        PartialPushError if only some of the targets failed."""
         raise NotImplementedError()
 
     async def report(
@@ -1,39 +1,146 @@
+import asyncio
+import time
+from datetime import datetime, timezone
 from pprint import pformat
 from typing import Union
 
-import requests
-from discord_webhook import DiscordEmbed, DiscordWebhook
 from loguru import logger
 
-from .base import Push
+from stream_notifier.http import get_session
+from stream_notifier.metrics import UPSTREAM_RESPONSES
+
+from .base import PartialPushError, Push
+
+
+class DiscordRateLimiter:
+    """Tracks Discord's X-RateLimit-* headers per webhook bucket.
+
+    Requests wait (without blocking the event loop) until their bucket has room."""
+
+    def __init__(self):
+        self.buckets: dict[str, str] = {}
+        self.limits: dict[str, tuple[int, float]] = {}
+        self.global_reset = 0.0
+
+    async def wait(self, url: str):
+        while True:
+            now = time.monotonic()
+            delay = self.global_reset - now
+
+            bucket = self.buckets.get(url, url)
+            remaining, reset = self.limits.get(bucket, (1, 0.0))
+            if remaining <= 0:
+                delay = max(delay, reset - now)
+
+            if delay <= 0:
+                break
+            await asyncio.sleep(delay)
+
+        # Reserve a request, so concurrent pushes don't all pass at once
+        if bucket in self.limits and reset > now:
+            self.limits[bucket] = (remaining - 1, reset)
+
+    def update(self, url: str, headers):
+        bucket = headers.get("X-RateLimit-Bucket")
+        if bucket:
+            self.buckets[url] = bucket
+
+        remaining = headers.get("X-RateLimit-Remaining")
+        reset_after = headers.get("X-RateLimit-Reset-After")
+        if remaining is not None and reset_after is not None:
+            reset = time.monotonic() + float(reset_after)
+            self.limits[self.buckets.get(url, url)] = (int(remaining), reset)
+
+    def block(self, url: str, retry_after: float, is_global=False):
+        reset = time.monotonic() + retry_after
+        if is_global:
+            self.global_reset = max(self.global_reset, reset)
+        else:
+            self.limits[self.buckets.get(url, url)] = (0, reset)
+
+
+# Webhooks may be shared by several push methods, so are their buckets
+_rate_limiter = DiscordRateLimiter()
 
 
 class DiscordPush(Push):
     def __init__(self, config: dict):
-        self.webhook_url = config["webhook url"]
-        if not self.webhook_url:
+        webhook_url = config["webhook url"]
+        if isinstance(webhook_url, str) or webhook_url is None:
+            webhook_url = [webhook_url]
+        self.webhook_urls = list(webhook_url)
+        self.retries = config.get("retries", 5)
+
+        if not all(self.webhook_urls):
             logger.info("Discord webhook url empty, skipping.")
             raise ValueError("Discord webhook url empty, skipping.")
 
     async def verify(self):
         logger.info("Verification of discord webhook url started.")
 
-        response = requests.get(self.webhook_url)
-
-        if not response:
-            raise AssertionError(
-                f"Webhook verification failed! Response:\n{pformat(response.json())}"
-            )
+        for url in self.webhook_urls:
+            async with get_session().get(url) as response:
+                if response.status != 200:
+                    raise AssertionError(
+                        "Webhook verification failed! Response:\n"
+                        f"{pformat(await response.json(content_type=None))}"
+                    )
 
         logger.info("Verification of discord webhook url complete.")
 
-    async def send(self, content, context):
+    async def execute(self, url: str, payload: dict):
+        for _ in range(self.retries + 1):
+            await _rate_limiter.wait(url)
+
+            async with get_session().post(
+                url, params={"wait": "true"}, json=payload
+            ) as response:
+                _rate_limiter.update(url, response.headers)
+                UPSTREAM_RESPONSES.inc(service="discord", status=response.status)
+
+                if response.status == 429:
+                    data = await response.json(content_type=None)
+                    retry_after = float(data.get("retry_after", 1))
+                    is_global = bool(data.get("global"))
+                    logger.warning(
+                        "Discord webhook rate limited, retry after {} seconds.",
+                        retry_after,
+                    )
+                    _rate_limiter.block(url, retry_after, is_global)
+                    continue
+
+                if response.status >= 400:
+                    raise RuntimeError(
+                        f"Discord webhook returned {response.status}: "
+                        f"{await response.text()}"
+                    )
+
+                return await response.json(content_type=None)
+
+        raise RuntimeError(f"Discord webhook still rate limited after {self.retries} retries")
+
+    async def execute_all(self, payload: dict, skip=()):
+        urls = [url for url in self.webhook_urls if url not in skip]
+        results = await asyncio.gather(
+            *(self.execute(url, payload) for url in urls),
+            return_exceptions=True,
+        )
+
+        done = []
+        errors = []
+        for url, result in zip(urls, results):
+            if isinstance(result, Exception):
+                logger.opt(exception=result).error("Discord webhook request failed!")
+                errors.append(result)
+            else:
+                done.append(url)
+
+        if errors:
+            raise PartialPushError(done, errors)
+
+    async def send(self, content, context, skip=()):
         logger.info(context)
-        DiscordWebhook(
-            url=self.webhook_url,
-            content=content,
-            rate_limit_retry=True,
-        ).execute()
+        await self.execute_all({"content": content}, skip)
 
         logger.info("Notified to discord webhook.")
 
@@ -44,14 +151,21 @@ class DiscordPush(Push):
         color=None,
         fields: Union[dict[str, str], None] = None,
     ):
-        embed = DiscordEmbed(title=title, description=desc, color=color)
-        embed.set_timestamp()
+        embed = {
+            "title": title,
+            "description": desc,
+            "color": color,
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+        }
 
         if fields:
+            embed["fields"] = []
             for title, value in fields.items():
                 if value == "":
                     value = None
-                embed.add_embed_field(name=title, value=str(value))
+                embed["fields"].append(
+                    {"name": title, "value": str(value), "inline": True}
+                )
 
-        result = DiscordWebhook(self.webhook_url, embeds=[embed]).execute()
-        result.raise_for_status()
+        embed = {key: value for key, value in embed.items() if value is not None}
+        await self.execute_all({"embeds": [embed]})
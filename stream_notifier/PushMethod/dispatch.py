@@ -0,0 +1,159 @@
+import asyncio
+from collections import deque
+from typing import Optional
+
+from loguru import logger
+
+from stream_notifier.ratelimit import TokenBucket
+
+# Most reports listed in a digest, and most characters of them (messages of
+# Discord embeds and Telegram are limited to 4096), the rest are only counted
+DIGEST_LIMIT = 20
+DIGEST_MAX_LENGTH = 3500
+
+
+class DispatchQueue:
+    """Sends to one push destination, one message at a time.
+
+    Stream pushes always go ahead of reports. Reports that pile up while waiting
+    are sent together as one digest. With a rate, messages are also limited by a
+    token bucket allowing bursts of up to `burst` messages. Reports are abandoned
+    after `timeout` seconds, so a hung report can't hold back the pushes."""
+
+    def __init__(
+        self,
+        name: str,
+        instance,
+        rate: Optional[float] = None,
+        burst: int = 1,
+        timeout: Optional[float] = None,
+    ):
+        self.name = name
+        self.instance = instance
+        self.timeout = timeout
+        self.bucket = TokenBucket(rate, burst) if rate else None
+
+        self.pushes = deque()
+        self.reports = []
+        self.ready = asyncio.Event()
+        self.idle = asyncio.Event()
+        self.idle.set()
+        self.worker: Optional[asyncio.Task] = None
+
+    def wake(self):
+        self.idle.clear()
+        self.ready.set()
+        if self.worker is None:
+            self.worker = asyncio.create_task(self.run())
+
+    async def push(self, job):
+        """Run job (a coroutine function) in turn, returning its result."""
+
+        future = asyncio.get_running_loop().create_future()
+        self.pushes.append((job, future))
+        self.wake()
+        return await future
+
+    def report(self, source=None, **kwargs):
+        """Queue a report, it is sent in the background.
+
+        source (e.g. the checker name) tells reports apart when sent as a digest."""
+
+        self.reports.append((source, kwargs))
+        self.wake()
+
+    async def run(self):
+        while True:
+            if not self.pushes and not self.reports:
+                self.idle.set()
+                self.ready.clear()
+                await self.ready.wait()
+                continue
+
+            if self.bucket is not None:
+                await self.bucket.acquire()
+
+            # Decided after waiting for the bucket, so pushes queued meanwhile go first
+            if self.pushes:
+                job, future = self.pushes.popleft()
+                if future.done():
+                    continue
+
+                try:
+                    result = await job()
+                except Exception as e:
+                    if not future.done():
+                        future.set_exception(e)
+                else:
+                    if not future.done():
+                        future.set_result(result)
+            else:
+                reports, self.reports = self.reports, []
+                try:
+                    await asyncio.wait_for(self.send_reports(reports), self.timeout)
+                except asyncio.TimeoutError:
+                    logger.error(
+                        "Report timed out for {} after {} seconds!",
+                        self.name,
+                        self.timeout,
+                    )
+                except Exception:
+                    logger.exception("Report failed for {}!", self.name)
+
+    @staticmethod
+    def digest_entry(source, report: dict) -> str:
+        title = report.get("title") or "Report"
+        desc = report.get("desc")
+        line = f"• {title}: {desc}" if desc else f"• {title}"
+        if source:
+            line = f"{line} ({source})"
+
+        lines = [line]
+        for name, value in (report.get("fields") or {}).items():
+            value = ", ".join(str(value).splitlines())
+            lines.append(f"    {name}: {value}")
+        return "\n".join(lines)
+
+    async def send_reports(self, reports: list[tuple]):
+        logger.info(
+            "Sending {} report(s) for {}", len(reports), type(self.instance).__name__
+        )
+        if len(reports) == 1:
+            await self.instance.report(**reports[0][1])
+            return
+
+        entries = []
+        length = 0
+        for source, report in reports[:DIGEST_LIMIT]:
+            entry = self.digest_entry(source, report)
+            length += len(entry) + 1
+            if entries and length > DIGEST_MAX_LENGTH:
+                break
+            entries.append(entry)
+        if len(reports) > len(entries):
+            entries.append(f"…and {len(reports) - len(entries)} more")
+
+        await self.instance.report(
+            title=f"{len(reports)} reports",
+            desc="\n".join(entries),
+            color=reports[0][1].get("color"),
+        )
+
+    async def close(self, timeout: float = 10):
+        """Wait for queued messages to be sent, up to timeout seconds."""
+
+        if self.worker is None:
+            return
+
+        try:
+            await asyncio.wait_for(self.idle.wait(), timeout)
+        except asyncio.TimeoutError:
+            logger.warning(
+                "Dropped {} pushes and {} reports for {}",
+                len(self.pushes),
+                len(self.reports),
+                self.name,
+            )
+
+        self.worker.cancel()
+        self.worker = None
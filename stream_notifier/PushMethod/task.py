@@ -1,12 +1,25 @@
 class PushTask:
-    def __init__(self, name, comment, push_instance, content, context, test_mode=False):
+    def __init__(
+        self,
+        name,
+        comment,
+        push_instance,
+        content,
+        context,
+        test_mode=False,
+        timeout=None,
+        skip=(),
+    ):
         self.name = name
         self.comment = comment
         self.instance = push_instance
         self.content = content
         self.context = context
         self.test_mode = test_mode
+        self.timeout = timeout
+        # Targets of the push method that already got the message
+        self.skip = skip
 
     async def send(self):
         if not self.test_mode:
-            await self.instance.send(self.content, self.context)
+            await self.instance.send(self.content, self.context, skip=self.skip)
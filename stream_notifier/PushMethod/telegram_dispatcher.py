@@ -0,0 +1,111 @@
+import asyncio
+from typing import Any, Optional
+
+from aiogram import Bot
+from aiogram.exceptions import (
+    TelegramAPIError,
+    TelegramBadRequest,
+    TelegramForbiddenError,
+    TelegramNotFound,
+    TelegramRetryAfter,
+    TelegramServerError,
+    TelegramUnauthorizedError,
+)
+from loguru import logger
+
+from stream_notifier.metrics import UPSTREAM_RESPONSES
+from stream_notifier.ratelimit import TokenBucket
+
+# aiogram raises these instead of exposing the status code
+_ERROR_STATUS = {
+    TelegramBadRequest: 400,
+    TelegramUnauthorizedError: 401,
+    TelegramForbiddenError: 403,
+    TelegramNotFound: 404,
+    TelegramRetryAfter: 429,
+    TelegramServerError: 500,
+}
+
+
+class TelegramDispatcher:
+    """Calls Telegram for many chats in parallel within the bot API rate limits.
+
+    Every call takes a token from the global bucket (~30 messages per second for
+    the whole bot) and from the bucket of its chat. RetryAfter responses pause the
+    chat bucket for the requested time before the call is retried."""
+
+    def __init__(
+        self, bot: Bot, global_rate: float = 30, chat_rate: float = 1, retries: int = 3
+    ):
+        self.bot = bot
+        self.global_bucket = TokenBucket(global_rate, capacity=global_rate)
+        self.chat_rate = chat_rate
+        self.chat_buckets: dict[Any, TokenBucket] = {}
+        self.retries = retries
+        self.background = set()
+
+    def chat_bucket(self, chat_id) -> TokenBucket:
+        if chat_id not in self.chat_buckets:
+            self.chat_buckets[chat_id] = TokenBucket(self.chat_rate)
+        return self.chat_buckets[chat_id]
+
+    async def call(self, chat_id, method, **kwargs):
+        bucket = self.chat_bucket(chat_id)
+
+        for attempt in range(self.retries + 1):
+            await bucket.acquire()
+            await self.global_bucket.acquire()
+
+            try:
+                result = await method(chat_id=chat_id, **kwargs)
+            except TelegramAPIError as e:
+                status = _ERROR_STATUS.get(type(e), "error")
+                UPSTREAM_RESPONSES.inc(service="telegram", status=status)
+                if not isinstance(e, TelegramRetryAfter) or attempt == self.retries:
+                    raise
+                logger.warning(
+                    "Telegram rate limited chat id {}, retry after {} seconds.",
+                    chat_id,
+                    e.retry_after,
+                )
+                bucket.block(e.retry_after)
+            else:
+                UPSTREAM_RESPONSES.inc(service="telegram", status=200)
+                return result
+
+    async def broadcast(self, chat_ids, text: str, **kwargs) -> list:
+        """Send the same message to every chat.
+
+        Returns a list of sent messages or exceptions, in the order of chat_ids."""
+
+        return await asyncio.gather(
+            *(
+                self.call(chat_id, self.bot.send_message, text=text, **kwargs)
+                for chat_id in chat_ids
+            ),
+            return_exceptions=True,
+        )
+
+    def pin_later(self, messages):
+        """Pin sent messages in background, so pinning never delays the next send."""
+
+        task = asyncio.create_task(self.pin(messages))
+        self.background.add(task)
+        task.add_done_callback(self.background.discard)
+
+    async def pin(self, messages):
+        async def pin_one(message):
+            try:
+                await self.call(
+                    message.chat.id,
+                    self.bot.pin_chat_message,
+                    message_id=message.message_id,
+                )
+            except Exception:
+                logger.exception("Failed to pin message: chat id {}.", message.chat.id)
+
+        await asyncio.gather(*(pin_one(message) for message in messages))
+
+    async def close(self, timeout: Optional[float] = 10):
+        if self.background:
+            await asyncio.wait(self.background, timeout=timeout)
@@ -5,7 +5,8 @@ from aiogram import Bot
 from aiogram.enums import ParseMode
 from loguru import logger
 
-from .base import Push
+from .base import PartialPushError, Push
+from .telegram_dispatcher import TelegramDispatcher
 
 
 class TelegramPush(Push):
@@ -20,6 +21,11 @@ class TelegramPush(Push):
             raise ValueError("One or more Telegram parameters are empty, skipping.")
 
         self.bot = Bot(token=self.token)
+        self.dispatcher = TelegramDispatcher(
+            self.bot,
+            global_rate=config.get("rate limit", 30),
+            chat_rate=config.get("chat rate limit", 1),
+        )
 
     async def verify(self):
         if self.skip_verify:
@@ -52,15 +58,30 @@ class TelegramPush(Push):
             len(self.chat_ids),
         )
 
-    async def send(self, content, context):
-        for chat_id in self.chat_ids:
-            try:
-                message = await self.bot.send_message(chat_id=chat_id, text=content)
-                if self.pin:
-                    await self.bot.pin_chat_message(message.chat.id, message.message_id)
-                logger.info("Notified to telegram channel {}.", chat_id)
-            except Exception:
-                logger.exception("Failed to send message or pin: chat id {}.", chat_id)
+    async def send(self, content, context, skip=()):
+        chat_ids = [chat_id for chat_id in self.chat_ids if chat_id not in skip]
+        results = await self.dispatcher.broadcast(chat_ids, content)
+
+        sent = []
+        done = []
+        errors = []
+        for chat_id, result in zip(chat_ids, results):
+            if isinstance(result, Exception):
+                logger.opt(exception=result).error(
+                    "Failed to send message: chat id {}.", chat_id
+                )
+                errors.append(result)
+                continue
+
+            sent.append(result)
+            done.append(chat_id)
+            logger.info("Notified to telegram channel {}.", chat_id)
+
+        if self.pin and sent:
+            self.dispatcher.pin_later(sent)
+
+        if errors:
+            raise PartialPushError(done, errors)
 
     async def report(
         self,
@@ -85,13 +106,16 @@ class TelegramPush(Push):
                     message.append(f"{escape(str(value))}")
                 message.append("")
 
-        for chat_id in self.chat_ids:
-            try:
-                await self.bot.send_message(
-                    chat_id, "\n".join(message), parse_mode=ParseMode.HTML
+        results = await self.dispatcher.broadcast(
+            self.chat_ids, "\n".join(message), parse_mode=ParseMode.HTML
+        )
+
+        for chat_id, result in zip(self.chat_ids, results):
+            if isinstance(result, Exception):
+                logger.opt(exception=result).error(
+                    "Telegram report failed! chat_id: {}", chat_id
                 )
-            except Exception:
-                logger.exception("Telegram report failed! chat_id: {}", chat_id)
 
     async def close(self):
+        await self.dispatcher.close()
         await self.bot.session.close()
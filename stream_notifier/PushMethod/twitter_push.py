@@ -1,6 +1,8 @@
 import tweepy
 from loguru import logger
 
+from stream_notifier.metrics import UPSTREAM_RESPONSES
+
 from .base import Push
 
 
@@ -24,7 +26,12 @@ class TwitterPush(Push):
             access_token_secret=self.token_secret,
         )
 
-    async def send(self, content, context):
-        self.api.create_tweet(text=content)
+    async def send(self, content, context, skip=()):
+        try:
+            self.api.create_tweet(text=content)
+        except tweepy.HTTPException as e:
+            UPSTREAM_RESPONSES.inc(service="twitter", status=e.response.status_code)
+            raise
+        UPSTREAM_RESPONSES.inc(service="twitter", status=201)
 
         logger.info("Notified to twitter.")
@@ -1,3 +1,6 @@
-from .main import StreamNotifier
+from .timing import startup_timer
+
+with startup_timer.measure("import stream_notifier"):
+    from .main import StreamNotifier
 
 __all__ = ["StreamNotifier"]
@@ -0,0 +1,5 @@
+from .base import CacheStore, to_json_safe
+from .json_store import JsonCacheStore
+from .sqlite_store import SqliteCacheStore
+
+__all__ = ["CacheStore", "JsonCacheStore", "SqliteCacheStore", "to_json_safe"]
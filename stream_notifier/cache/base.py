@@ -0,0 +1,139 @@
+import asyncio
+import json
+import threading
+
+from loguru import logger
+
+
+def to_json_safe(value):
+    """Convert value into what it would become after a JSON round trip.
+
+    Objects JSON can't represent are replaced with "<<TypeName>>"."""
+
+    if value is None or isinstance(value, (bool, int, float)):
+        return value
+    if isinstance(value, str):
+        return str(value)
+    if isinstance(value, dict):
+        return {
+            key if isinstance(key, str) else json.dumps(key): to_json_safe(item)
+            for key, item in value.items()
+        }
+    if isinstance(value, (list, tuple)):
+        return [to_json_safe(item) for item in value]
+    return f"<<{type(value).__qualname__}>>"
+
+
+class CacheStore:
+    """Write-behind store of checker state, kept in memory only.
+
+    Subclasses persist entries by implementing load(), write_entries(),
+    delete_entries() and stored_names(). Entries are only written when they
+    changed, in batches, every flush_interval seconds and on close(), unless
+    written right away with persist()."""
+
+    # Whether entries live in storage that other processes can share
+    persistent = False
+
+    def __init__(self, flush_interval: float = 5):
+        self.flush_interval = flush_interval
+        self.entries: dict[str, dict] = {}
+        self.dirty: dict[str, dict] = {}
+        self.write_lock = threading.Lock()
+
+    def load(self, name: str):
+        return None
+
+    def write_entries(self, entries: dict[str, dict]):
+        pass
+
+    def delete_entries(self, names: list[str]):
+        pass
+
+    def stored_names(self) -> list[str]:
+        return []
+
+    def get(self, name: str) -> dict:
+        if name not in self.entries:
+            try:
+                self.entries[name] = self.load(name) or {}
+            except Exception:
+                self.entries[name] = {}
+
+        return self.entries[name]
+
+    def refresh(self, name: str) -> dict:
+        """Read name again from storage, another process may have changed it.
+
+        Values not written yet are newer than the stored ones, and kept."""
+
+        if self.persistent and name not in self.dirty:
+            self.entries.pop(name, None)
+        return self.get(name)
+
+    def set(self, name: str, value: dict) -> bool:
+        """Store value, returns whether it differs from the stored one."""
+
+        value = to_json_safe(value)
+        if self.entries.get(name) == value:
+            return False
+
+        self.entries[name] = value
+        self.dirty[name] = value
+        return True
+
+    def keys(self, prefix: str = "") -> list[str]:
+        names = set(self.entries) | set(self.stored_names())
+        return sorted(name for name in names if name.startswith(prefix))
+
+    async def persist(self, name: str, value: dict):
+        """Store value and write it right away, instead of on the next flush."""
+
+        value = to_json_safe(value)
+        self.entries[name] = value
+        self.dirty.pop(name, None)
+        try:
+            await asyncio.to_thread(self.write, {name: value})
+        except Exception:
+            logger.exception("Failed to write cache entry {}", name)
+            self.dirty[name] = value
+
+    async def delete(self, name: str):
+        self.entries.pop(name, None)
+        self.dirty.pop(name, None)
+        try:
+            await asyncio.to_thread(self.remove, [name])
+        except Exception:
+            logger.exception("Failed to delete cache entry {}", name)
+
+    def remove(self, names: list[str]):
+        with self.write_lock:
+            self.delete_entries(names)
+
+    def take_dirty(self) -> dict[str, dict]:
+        dirty, self.dirty = self.dirty, {}
+        return dirty
+
+    def write(self, entries: dict[str, dict]):
+        if not entries:
+            return
+        with self.write_lock:
+            self.write_entries(entries)
+
+    def flush(self):
+        self.write(self.take_dirty())
+
+    async def run(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+
+            entries = self.take_dirty()
+            try:
+                await asyncio.to_thread(self.write, entries)
+            except Exception:
+                logger.exception("Failed to write {} cache entries", len(entries))
+                # Keep newer values set while writing
+                self.dirty = entries | self.dirty
+
+    def close(self):
+        self.flush()
@@ -0,0 +1,52 @@
+import json
+import os
+import pathlib
+import tempfile
+
+from .base import CacheStore
+
+
+class JsonCacheStore(CacheStore):
+    """Keeps each entry in its own cache-<name>.json file."""
+
+    persistent = True
+
+    def __init__(self, directory: pathlib.Path, **kwargs):
+        super().__init__(**kwargs)
+        self.directory = pathlib.Path(directory)
+
+    def path(self, name: str) -> pathlib.Path:
+        return self.directory / f"cache-{name}.json"
+
+    def load(self, name: str):
+        with self.path(name).open() as f:
+            return json.load(f)
+
+    def write_entries(self, entries: dict[str, dict]):
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+        for name, value in entries.items():
+            # Write then rename, so a crash never leaves a partial cache file. The
+            # temp file is unique, replicas sharing the directory may write at once
+            fd, temp_path = tempfile.mkstemp(
+                dir=self.directory, prefix=f"cache-{name}.", suffix=".tmp"
+            )
+            try:
+                with os.fdopen(fd, "w") as f:
+                    json.dump(value, f, indent=2)
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(temp_path, self.path(name))
+            except BaseException:
+                os.unlink(temp_path)
+                raise
+
+    def delete_entries(self, names: list[str]):
+        for name in names:
+            self.path(name).unlink(missing_ok=True)
+
+    def stored_names(self) -> list[str]:
+        return [
+            path.name.removeprefix("cache-").removesuffix(".json")
+            for path in self.directory.glob("cache-*.json")
+        ]
@@ -0,0 +1,86 @@
+import json
+import pathlib
+import sqlite3
+import time
+
+from loguru import logger
+
+from .base import CacheStore
+
+
+class SqliteCacheStore(CacheStore):
+    """Keeps every entry in one SQLite database in WAL mode.
+
+    Each flush commits all changed entries in a single transaction."""
+
+    persistent = True
+
+    def __init__(self, path: pathlib.Path, **kwargs):
+        super().__init__(**kwargs)
+        self.path = pathlib.Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+
+        # Shared with the flushing thread, access is serialized by write_lock
+        self.connection = sqlite3.connect(self.path, check_same_thread=False)
+        with self.write_lock, self.connection:
+            self.connection.execute("PRAGMA journal_mode=WAL")
+            self.connection.execute("PRAGMA synchronous=NORMAL")
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS cache ("
+                "name TEXT PRIMARY KEY, value TEXT NOT NULL, updated_at REAL NOT NULL)"
+            )
+
+    def load(self, name: str):
+        with self.write_lock:
+            row = self.connection.execute(
+                "SELECT value FROM cache WHERE name = ?", (name,)
+            ).fetchone()
+
+        return json.loads(row[0]) if row else None
+
+    def write_entries(self, entries: dict[str, dict]):
+        now = time.time()
+        with self.connection:
+            self.connection.executemany(
+                "INSERT INTO cache (name, value, updated_at) VALUES (?, ?, ?) "
+                "ON CONFLICT(name) DO UPDATE SET "
+                "value = excluded.value, updated_at = excluded.updated_at",
+                [(name, json.dumps(value), now) for name, value in entries.items()],
+            )
+
+    def delete_entries(self, names: list[str]):
+        with self.connection:
+            self.connection.executemany(
+                "DELETE FROM cache WHERE name = ?", [(name,) for name in names]
+            )
+
+    def stored_names(self) -> list[str]:
+        with self.write_lock:
+            rows = self.connection.execute("SELECT name FROM cache").fetchall()
+
+        return [row[0] for row in rows]
+
+    def import_json(self, directory: pathlib.Path) -> int:
+        """Import cache-<name>.json files of entries not in the database yet."""
+
+        rows = []
+        for path in sorted(pathlib.Path(directory).glob("cache-*.json")):
+            name = path.name.removeprefix("cache-").removesuffix(".json")
+            try:
+                value = json.loads(path.read_text())
+            except Exception:
+                logger.exception("Skipping unreadable cache file {}", path)
+                continue
+            rows.append((name, json.dumps(value), path.stat().st_mtime))
+
+        with self.write_lock, self.connection:
+            cursor = self.connection.executemany(
+                "INSERT OR IGNORE INTO cache (name, value, updated_at) VALUES (?, ?, ?)",
+                rows,
+            )
+
+        return cursor.rowcount
+
+    def close(self):
+        super().close()
+        self.connection.close()
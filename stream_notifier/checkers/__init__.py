@@ -1,23 +1,33 @@
 import asyncio
+import datetime
 import json
-import pathlib
-from importlib import import_module
-from time import time
+from collections import deque
+from time import perf_counter, time
 from typing import Literal
 
 from addict import Dict
-from aiohttp import ClientSession, ClientTimeout
+from aiohttp import ClientTimeout
 from loguru import logger
 from pydantic import validate_call
 
+from stream_notifier.cache import CacheStore
+from stream_notifier.http import NotModified, get_session
+from stream_notifier.leader import Leader
+from stream_notifier.metrics import CACHE_WRITES, CHECK_DURATION, CHECKS
+from stream_notifier.outbox import Outbox
 from stream_notifier.PushMethod import Push
+from stream_notifier.timing import startup_timer
 from stream_notifier.model import PushContext
 
+# Events seen while standing by are pushed on takeover if they are this recent
+DEFERRED_MAX_AGE = 900
+DEFERRED_LIMIT = 100
+
 
 @validate_call
 def import_checker(checker_type: Literal["debug", "twitch", "twitter", "youtube"]):
     base = "".join(word.capitalize() for word in checker_type.split("_"))
-    module = import_module(f".{checker_type}", __name__)
+    module = startup_timer.import_module(f".{checker_type}", __name__)
     return (
         getattr(module, f"{base}Checker"),
         getattr(module, f"{base}CheckerConfig"),
@@ -26,7 +36,16 @@ def import_checker(checker_type: Literal["debug", "twitch", "twitter", "youtube"
 
 
 class StreamChecker:
-    def __init__(self, config, push: Push, cache_file: pathlib.Path):
+    def __init__(
+        self,
+        name: str,
+        config,
+        push: Push,
+        store: CacheStore,
+        leader: Leader = None,
+        outbox: Outbox = None,
+    ):
+        self.name = name
         self.type = config.pop("type")
         checker_cls, checker_config_cls, push_rule_cls = import_checker(self.type)
 
@@ -44,37 +63,66 @@ class StreamChecker:
             self.push_rules.append(self.instance)
 
         self.push = push
-        self.cache = None
-        self.cache_file = cache_file
+        self.store = store
+        self.leader = leader or Leader()
+        # Without an outbox, pushes are sent right away and not retried
+        self.outbox = outbox
+        # (time, key, contents, info) of events seen while not the leader
+        self.deferred = deque(maxlen=DEFERRED_LIMIT)
         self.last_reported_http = 0
+        self.scheduler = None
+        self.report_tasks = set()
+
+        # Change detection of run_check results
+        self.last_fingerprint = None
+        self.check_count = 0
+        self.unchanged_count = 0
 
     def get_cache(self):
-        if self.cache is None:
-            try:
-                with self.cache_file.open() as f:
-                    self.cache = json.load(f)
-            except Exception:
-                self.cache = {}
+        return self.store.get(self.name)
 
-        return self.cache
+    @staticmethod
+    def cache_dump(info):
+        # Remove internal attributes that starts with _
+        return {key: value for key, value in info.items() if not key.startswith("_")}
 
     def set_cache(self, info):
-        # Remove internal attributes that starts with _
-        dump = {key: value for key, value in info.items() if not key.startswith("_")}
-        content = json.dumps(
-            dump, default=lambda o: f"<<{type(o).__qualname__}>>", indent=2
-        )
-        if self.cache_file:
-            self.cache_file.write_text(content)
-        self.cache = json.loads(content)
-        return content
+        changed = self.store.set(self.name, self.cache_dump(info))
+        CACHE_WRITES.inc(checker=self.name, changed=str(changed).lower())
+        return self.get_cache()
+
+    async def persist_cache(self, info):
+        """Write the new state right away, instead of on the next store flush."""
 
-    async def sleep(self):
-        await asyncio.sleep(self.interval)
+        await self.store.persist(self.name, self.cache_dump(info))
+        CACHE_WRITES.inc(checker=self.name, changed="true")
+        return self.get_cache()
+
+    def trigger(self):
+        """Run the next check right away."""
+
+        if self.scheduler is not None:
+            self.scheduler.trigger(self)
+
+    async def next_interval(self):
+        adaptive = self.config.adaptive
+        if not adaptive:
+            return self.interval
+
+        try:
+            starts = await self.instance.expected_starts()
+        except Exception:
+            logger.exception("Failed to get expected start times")
+            starts = []
+
+        now = datetime.datetime.now(datetime.timezone.utc)
+        return adaptive.interval(now, starts)
 
     @property
     def interval(self):
-        return self.config.interval or self.instance.config.check_interval
+        return self.instance.poll_interval(
+            self.config.interval or self.instance.config.check_interval
+        )
 
     @property
     def active_push_destinations(self):
@@ -83,32 +131,33 @@ class StreamChecker:
                 yield name
 
     async def send_report(self, **kwargs):
+        # Only the leader reports, standby replicas would duplicate them
+        if not self.leader.is_leader:
+            return
+
         args = {"color": self.instance.config.color} | kwargs
-        await self.push.send_report(self.config.report, **args)
+        await self.push.send_report(self.config.report, source=self.name, **args)
 
-    async def send_report_http(self, text=None):
+    async def send_report_http(self, info=None):
         if not self.config.report_url:
             return
 
         if time() - self.last_reported_http > self.config.report_interval:
             self.last_reported_http = time()
+            text = None if info is None else json.dumps(info, indent=2)
             timeout = ClientTimeout(total=10)
-            async with ClientSession(timeout=timeout) as session:
-                async with session.post(str(self.config.report_url), data=text):
-                    pass
-
-    async def run_once(self):
-        last_notified = Dict(self.get_cache())
-        info = Dict(await self.instance.run_check(last_notified))
-
-        if not info:
-            return
+            async with get_session().post(
+                str(self.config.report_url), data=text, timeout=timeout
+            ):
+                pass
 
+    async def process(self, last_notified, info):
         await self.instance.process_result(info)
-        cached_content = self.set_cache(info)
         summary = self.instance.summary(info)
 
-        for rule, contents in zip(self.push_rules, self.push_contents):
+        queued = False
+        rules = zip(self.push_rules, self.push_contents)
+        for index, (rule, contents) in enumerate(rules):
             try:
                 if not self.instance.verify_push(rule, last_notified, info):
                     continue
@@ -121,24 +170,120 @@ class StreamChecker:
                 )
                 continue
 
-            await self.send_report(
-                title=f"Stream found for {type(self.instance).__qualname__}",
-                fields=summary,
-            )
+            key = f"{self.name}:{index}:{self.instance.event_key(info)}"
+            if not self.leader.is_leader:
+                logger.info("Standing by, deferred push of event {}", key)
+                self.deferred.append((time(), key, contents, info))
+                continue
 
-            try:
-                context = PushContext(type=self.type, data=info)
+            # Queued in the outbox before the new state is committed, so a crash
+            # in between can't lose the push
+            queued |= await self.notify(key, contents, info, summary)
+
+        if queued:
+            # The outbox entry is on disk already, the state that caused it must be
+            # too, or a crash before the next flush would push the event again
+            return await self.persist_cache(info)
+
+        return self.set_cache(info)
+
+    async def notify(self, key, contents, info, summary):
+        """Push an event, returns whether it was queued in the outbox."""
+
+        if not await self.leader.claim(key):
+            logger.info("Event {} was already pushed by another replica", key)
+            return False
+
+        await self.send_report(
+            title=f"Stream found for {type(self.instance).__qualname__}",
+            fields=summary,
+        )
+
+        try:
+            context = PushContext(type=self.type, data=info)
+            if self.outbox is None:
                 await self.push.send_push(contents, context, **info)
-            except Exception as e:
-                await self.send_report(
-                    title="Notification Push failed!❌",
-                    desc=f"{type(e).__name__}: {str(e)}",
+            else:
+                await self.outbox.put(
+                    self.name, contents, context, self.config.report, **info
                 )
-                logger.exception("Push notification failed!")
+                return True
+        except Exception as e:
+            await self.send_report(
+                title="Notification Push failed!❌",
+                desc=f"{type(e).__name__}: {str(e)}",
+            )
+            logger.exception("Push notification failed!")
+
+        return False
+
+    async def push_deferred(self):
+        """Push the recent events seen while standing by, unless already pushed."""
+
+        deferred = list(self.deferred)
+        self.deferred.clear()
+        for deferred_at, key, contents, info in deferred:
+            if time() - deferred_at > DEFERRED_MAX_AGE:
+                continue
+            await self.notify(key, contents, info, self.instance.summary(info))
+
+    async def run_once(self):
+        last_notified = Dict(self.get_cache())
+        started = perf_counter()
+        try:
+            result = await self.instance.run_check(last_notified)
+        except NotModified:
+            # Upstream answered 304, there is not even a result to compare
+            self.check_count += 1
+            return self.skip_unchanged("not_modified")
+        except Exception:
+            CHECKS.inc(checker=self.name, outcome="error")
+            raise
+        finally:
+            CHECK_DURATION.observe(perf_counter() - started, checker_type=self.type)
+        self.check_count += 1
+
+        if not result:
+            CHECKS.inc(checker=self.name, outcome="empty")
+            self.last_fingerprint = None
+            return
+
+        # Same result as the last poll, the pipeline would come to the same conclusion
+        fingerprint = self.instance.fingerprint(result)
+        if fingerprint == self.last_fingerprint:
+            return self.skip_unchanged("unchanged")
 
-        return cached_content
+        # Some checkers return every new item since the last check, oldest first
+        items = result if isinstance(result, list) else [result]
+        for item in items:
+            cached = await self.process(last_notified, Dict(item))
+            last_notified = Dict(cached)
 
-    async def run(self):
+        self.last_fingerprint = fingerprint
+        CHECKS.inc(checker=self.name, outcome="changed")
+        return cached
+
+    def skip_unchanged(self, outcome):
+        CHECKS.inc(checker=self.name, outcome=outcome)
+        self.unchanged_count += 1
+        logger.debug(
+            "Checker {} unchanged, skipped {} of {} checks",
+            self.name,
+            self.unchanged_count,
+            self.check_count,
+        )
+        return self.get_cache()
+
+    async def close(self):
+        await self.instance.close()
+
+    async def prepare(self):
+        try:
+            await self.instance.prepare(self.store)
+        except Exception:
+            logger.exception("Failed to prepare checker {}", self.name)
+
+    async def start(self):
         await self.send_report(
             title="Stream Notifier Started",
             fields={
@@ -154,14 +299,17 @@ class StreamChecker:
             },
         )
 
-        report_tasks = set()
+        # A webhook subscription failing must not take down every other checker
+        try:
+            await self.instance.start(self.trigger)
+        except Exception:
+            logger.exception("Failed to start checker {}, polling only", self.name)
 
-        while True:
-            await self.sleep()
-            try:
-                info = await self.run_once()
-                task = asyncio.create_task(self.send_report_http(info))
-                report_tasks.add(task)
-                task.add_done_callback(report_tasks.discard)
-            except Exception:
-                logger.exception("Error while checking for stream")
+    async def tick(self):
+        try:
+            info = await self.run_once()
+            task = asyncio.create_task(self.send_report_http(info))
+            self.report_tasks.add(task)
+            task.add_done_callback(self.report_tasks.discard)
+        except Exception:
+            logger.exception("Error while checking for stream")
@@ -1,8 +1,11 @@
+import hashlib
+import json
 from typing import Any, Optional
 
 from pydantic import Field, HttpUrl
 
 from stream_notifier.model import BaseModel, Color
+from stream_notifier.schedule import AdaptiveSchedule
 
 
 class StreamCheckerPushRule(BaseModel):
@@ -20,16 +23,53 @@ class CheckerConfig(BaseModel):
     interval: Optional[float] = None
     report_url: Optional[HttpUrl] = None
     report_interval: int = 20
+    adaptive: Optional[AdaptiveSchedule] = None
 
 
 class CheckerBase:
     """ABC for all stream checkers"""
 
+    async def prepare(self, store):
+        """Called once at startup before start(), with the shared state store.
+
+        Lets checkers look up what they need in bulk, and keep it across restarts."""
+
+    async def start(self, trigger):
+        """Called once before the first check.
+
+        trigger() can be called at any time to request a check as soon as possible,
+        e.g. when the checker is notified of changes by a webhook.
+        """
+
+    def poll_interval(self, interval):
+        """Seconds between checks, given the configured interval."""
+
+        return interval
+
+    async def expected_starts(self):
+        """Known upcoming (or just started) stream start times, timezone-aware."""
+
+        return []
+
     async def run_check(self, last_notified):
-        """Check for requested resource, and return the latest instance in a dict."""
+        """Check for requested resource, and return the latest instance in a dict.
+
+        May also return a list of every new instance since last_notified, oldest first.
+        """
 
         raise NotImplementedError()
 
+    def fingerprint(self, result) -> str:
+        """Stable digest of a run_check result, used to skip unchanged results."""
+
+        dump = json.dumps(result, sort_keys=True, default=str)
+        return hashlib.blake2b(dump.encode(), digest_size=16).hexdigest()
+
+    def event_key(self, info) -> str:
+        """Identifies the event in info, used to push it at most once across replicas."""
+
+        return str(info.id)
+
     async def process_result(self, info):
         """Add additional attributes to returned result from run_check."""
 
@@ -48,3 +88,6 @@ class CheckerBase:
     @classmethod
     def summary(cls, info):
         return info
+
+    async def close(self):
+        """Release resources held by the checker, such as HTTP sessions."""
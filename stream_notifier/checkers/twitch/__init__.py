@@ -1,16 +1,35 @@
-from functools import cache
+import asyncio
+import time
+from typing import Optional
 
 from loguru import logger
+from pydantic import HttpUrl
 
 from stream_notifier.model import BaseModel, Color
 
 from ..base import CheckerBase, CheckerConfig
-from .twitch_api_client import TwitchClient
+from .eventsub import get_receiver
+from .poller import get_poller
+
+EVENTSUB_TYPES = {"stream.online": "1", "channel.update": "2"}
+
+# Helix may not list the stream right after stream.online, so check again later
+EVENT_RECHECK_DELAYS = (5, 15, 30)
 
 
 class PollingApi(BaseModel):
     twitch_app_id: str
     twitch_app_secret: str
+    # How long a stream lookup waits for other checkers to join the batch
+    batch_window: float = 0.5
+
+
+class EventSub(BaseModel):
+    # Public URL routed to the built-in HTTP server, its path is served locally
+    callback_url: HttpUrl
+    secret: str
+    # Polling only reconciles missed events in EventSub mode
+    reconcile_interval: int = 300
 
 
 class TwitchCheckerConfig(CheckerConfig):
@@ -18,31 +37,133 @@ class TwitchCheckerConfig(CheckerConfig):
     check_interval: int = 2
     channel_name: str
     polling_api: PollingApi
-
-    def create_client(self):
-        return TwitchClient(
-            self.polling_api.twitch_app_id, self.polling_api.twitch_app_secret
+    api_timeout: float = 10
+    eventsub: Optional[EventSub] = None
+
+    def create_poller(self):
+        return get_poller(
+            self.polling_api.twitch_app_id,
+            self.polling_api.twitch_app_secret,
+            timeout=self.api_timeout,
+            window=self.polling_api.batch_window,
         )
 
 
 class TwitchChecker(CheckerBase):
     def __init__(self, config: TwitchCheckerConfig):
         self.config = config
-        self.client = self.config.create_client()
+        self.poller = self.config.create_poller()
+        self.poller.attach(self)
+        self.client = self.poller.client
+        self.user = None
+        self.trigger = None
+        self.receiver = None
+        self.subscribed = False
+        self.subscribe_attempted = 0
         logger.info("Target Channel: {}", self.config.channel_name)
 
-    @cache
-    def get_user(self):
-        return self.client.get_user(self.config.channel_name)
+        # One receiver per callback path, it dispatches events to this checker
+        # once start() has registered its broadcaster
+        if self.config.eventsub:
+            self.receiver = get_receiver(
+                str(self.config.eventsub.callback_url), self.config.eventsub.secret
+            )
+
+    def poll_interval(self, interval):
+        # Until subscribed, polling is the only way to notice streams
+        if self.config.eventsub and self.subscribed:
+            return self.config.eventsub.reconcile_interval
+        return interval
+
+    async def prepare(self, store):
+        self.user = await self.poller.get_user(self.config.channel_name, store)
+
+    async def start(self, trigger):
+        self.trigger = trigger
+        if self.config.eventsub:
+            await self.subscribe()
+
+    async def subscribe(self):
+        self.subscribe_attempted = time.time()
+        user = await self.get_user()
+        self.receiver.add_handler(user.id, self.on_event, self.on_revoked)
+        for type_, version in EVENTSUB_TYPES.items():
+            created = await self.client.create_eventsub_subscription(
+                type_,
+                version,
+                {"broadcaster_user_id": user.id},
+                str(self.config.eventsub.callback_url),
+                self.config.eventsub.secret,
+            )
+            if not created:
+                logger.info("EventSub {} already subscribed", type_)
+
+        self.subscribed = True
+
+    async def retry_subscribe(self):
+        eventsub = self.config.eventsub
+        if time.time() - self.subscribe_attempted < eventsub.reconcile_interval:
+            return
+
+        try:
+            await self.subscribe()
+        except Exception:
+            logger.exception(
+                "Failed to subscribe to EventSub of {}, still polling",
+                self.config.channel_name,
+            )
+
+    def on_event(self, type_, event):
+        logger.info(
+            "Received {} for {}", type_, event.get("broadcaster_user_login")
+        )
+        if self.trigger is None:
+            return
+
+        self.trigger()
+        loop = asyncio.get_running_loop()
+        for delay in EVENT_RECHECK_DELAYS:
+            loop.call_later(delay, self.trigger)
+
+    def on_revoked(self, type_, status):
+        logger.warning(
+            "EventSub {} of {} revoked ({}), polling until subscribed again",
+            type_,
+            self.config.channel_name,
+            status,
+        )
+        # Fall back to the check interval, and resubscribe on the next check
+        self.subscribed = False
+        self.subscribe_attempted = 0
+        if self.trigger is not None:
+            self.trigger()
+
+    async def get_user(self):
+        if self.user is None:
+            self.user = await self.client.get_user(self.config.channel_name)
+        return self.user
 
     async def run_check(self, last_notified):
-        user = self.get_user()
+        if self.config.eventsub and not self.subscribed:
+            await self.retry_subscribe()
+
+        user = await self.get_user()
 
-        output = self.client.get_stream(user.id, log=False)
+        output = await self.poller.get_stream(user.id)
 
         if output:
             return output.as_dict()
 
+    def fingerprint(self, result):
+        # Viewer count changes all the time but never affects pushes
+        result = {k: v for k, v in result.items() if k != "viewer_count"}
+        return super().fingerprint(result)
+
+    async def close(self):
+        if self.receiver and self.user:
+            self.receiver.remove_handler(self.user.id, self.on_event)
+        await self.poller.detach(self, self.user and self.user.id)
+
     async def process_result(self, info):
         info.link = f"https://www.twitch.tv/{info.user_login}"
 
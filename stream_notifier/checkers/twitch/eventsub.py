@@ -0,0 +1,161 @@
+"""
+Receiver of Twitch EventSub webhook notifications.
+
+https://dev.twitch.tv/docs/eventsub/handling-webhook-events/
+"""
+
+import hashlib
+import hmac
+import json
+import time
+from collections import OrderedDict
+from datetime import timezone
+from typing import Callable
+from urllib.parse import urlparse
+
+from aiohttp import web
+from dateutil.parser import isoparse
+from loguru import logger
+
+from stream_notifier.server import server
+
+# Twitch recommends rejecting notifications older than 10 minutes
+MAX_MESSAGE_AGE = 600
+
+
+def sign_payload(secret: str, message_id: str, timestamp: str, body: bytes) -> str:
+    """Compute the Twitch-Eventsub-Message-Signature header value of a message."""
+
+    message = message_id.encode() + timestamp.encode() + body
+    digest = hmac.new(secret.encode(), message, hashlib.sha256).hexdigest()
+    return f"sha256={digest}"
+
+
+class EventSubReceiver:
+    """Handles every EventSub message sent to one callback path.
+
+    Notifications and revocations are dispatched to the handlers of their
+    broadcaster."""
+
+    def __init__(self, secret: str, history=1000):
+        self.secret = secret
+        self.history = history
+        self.seen: OrderedDict[str, None] = OrderedDict()
+        # broadcaster_user_id -> (on_event(type, event), on_revoked(type, status))
+        # of every checker watching it
+        self.handlers: dict[str, list[tuple[Callable, Callable | None]]] = {}
+
+    def add_handler(self, broadcaster_user_id: str, on_event, on_revoked=None):
+        handlers = self.handlers.setdefault(broadcaster_user_id, [])
+        if all(handler != on_event for handler, _ in handlers):
+            handlers.append((on_event, on_revoked))
+
+    def remove_handler(self, broadcaster_user_id: str, on_event):
+        handlers = [
+            (handler, on_revoked)
+            for handler, on_revoked in self.handlers.get(broadcaster_user_id, [])
+            if handler != on_event
+        ]
+        if handlers:
+            self.handlers[broadcaster_user_id] = handlers
+        else:
+            self.handlers.pop(broadcaster_user_id, None)
+
+    def is_duplicate(self, message_id: str) -> bool:
+        if message_id in self.seen:
+            return True
+
+        self.seen[message_id] = None
+        if len(self.seen) > self.history:
+            self.seen.popitem(last=False)
+        return False
+
+    async def handle(self, request: web.Request) -> web.Response:
+        body = await request.read()
+
+        try:
+            message_id = request.headers["Twitch-Eventsub-Message-Id"]
+            timestamp = request.headers["Twitch-Eventsub-Message-Timestamp"]
+            signature = request.headers["Twitch-Eventsub-Message-Signature"]
+            message_type = request.headers["Twitch-Eventsub-Message-Type"]
+        except KeyError as e:
+            logger.warning("EventSub request without {} header", e)
+            return web.Response(status=400)
+
+        expected = sign_payload(self.secret, message_id, timestamp, body)
+        if not hmac.compare_digest(expected, signature):
+            logger.warning("EventSub message {} has invalid signature", message_id)
+            return web.Response(status=403)
+
+        try:
+            sent_at = isoparse(timestamp)
+        except ValueError:
+            logger.warning("EventSub message {} has invalid timestamp", message_id)
+            return web.Response(status=400)
+
+        # Twitch sends UTC, don't let a missing offset make it local time
+        if sent_at.tzinfo is None:
+            sent_at = sent_at.replace(tzinfo=timezone.utc)
+
+        if time.time() - sent_at.timestamp() > MAX_MESSAGE_AGE:
+            logger.warning("EventSub message {} is too old", message_id)
+            return web.Response(status=403)
+
+        if self.is_duplicate(message_id):
+            return web.Response(status=204)
+
+        payload = json.loads(body)
+        subscription = payload.get("subscription", {})
+
+        if message_type == "webhook_callback_verification":
+            logger.info("EventSub subscription {} verified", subscription.get("type"))
+            return web.Response(text=payload["challenge"], content_type="text/plain")
+
+        if message_type == "revocation":
+            # Revocations carry no event, only the condition of the subscription
+            user_id = subscription.get("condition", {}).get("broadcaster_user_id")
+            logger.warning(
+                "EventSub subscription {} for broadcaster {} revoked: {}",
+                subscription.get("type"),
+                user_id,
+                subscription.get("status"),
+            )
+            for _, on_revoked in self.handlers.get(user_id, []):
+                if on_revoked is not None:
+                    on_revoked(subscription.get("type"), subscription.get("status"))
+
+        if message_type == "notification":
+            event = payload.get("event", {})
+            user_id = event.get("broadcaster_user_id")
+            handlers = self.handlers.get(user_id, [])
+            logger.info(
+                "EventSub notification {} for broadcaster {}",
+                subscription.get("type"),
+                user_id,
+            )
+            if not handlers:
+                logger.warning("No checker watches EventSub broadcaster {}", user_id)
+
+            for on_event, _ in handlers:
+                on_event(subscription.get("type"), event)
+
+        return web.Response(status=204)
+
+
+# Callback path -> receiver, shared by every checker using the path
+_receivers: dict[str, EventSubReceiver] = {}
+
+
+def get_receiver(callback_url: str, secret: str) -> EventSubReceiver:
+    """Get the receiver of the path of callback_url, registering its route once."""
+
+    path = urlparse(callback_url).path
+    receiver = _receivers.get(path)
+    if receiver is None:
+        receiver = _receivers[path] = EventSubReceiver(secret)
+        server.add_route("POST", path, receiver.handle)
+    elif receiver.secret != secret:
+        # Messages are signed with the secret of the subscription, can't tell them apart
+        raise ValueError(f"EventSub checkers using {path} must share the same secret")
+
+    return receiver
@@ -0,0 +1,198 @@
+"""
+Coalesces stream lookups of every Twitch checker using the same app credentials.
+
+Helix accepts up to 100 user_id per /streams request, so instead of one request
+per checker, lookups arriving within a short window are sent together and each
+checker receives its own slice of the result. Resolving channel names to users
+at startup works the same way with /users, and results are kept in the store.
+"""
+
+import asyncio
+import time
+from typing import Dict, Hashable, Optional, Set
+
+from loguru import logger
+
+from stream_notifier.cache import CacheStore
+from stream_notifier.registry import registry
+
+from .twitch_api_client import TwitchChannel, TwitchClient, TwitchUser
+
+# Maximum user_id per helix/streams request, or login per helix/users request
+BATCH_SIZE = 100
+
+# Store entries of resolved users, one per login. Keyed by login only, so shards
+# (which share the store) never overwrite each other's users
+USER_PREFIX = "twitch-user-"
+# Logins can be renamed and taken over, so resolved users are looked up again
+USERS_TTL = 7 * 24 * 3600
+
+
+class TwitchStreamPoller:
+    def __init__(self, key: Hashable, client: TwitchClient, window: float = 0.5):
+        self.key = key
+        self.client = client
+        self.window = window
+
+        self.checkers = set()
+        self.user_ids: Set[str] = set()
+        self.pending: Dict[str, asyncio.Future] = {}
+        self.ready = asyncio.Event()
+        self.flush_task: Optional[asyncio.Task] = None
+
+        # Logins to resolve, and the number of checkers waiting for them
+        self.user_requests: Dict[str, asyncio.Future] = {}
+        self.user_waiters = 0
+        self.users_ready = asyncio.Event()
+        self.users_task: Optional[asyncio.Task] = None
+
+    async def get_stream(self, user_id: str) -> Optional[TwitchChannel]:
+        self.user_ids.add(user_id)
+
+        future = self.pending.get(user_id)
+        if future is None:
+            future = asyncio.get_running_loop().create_future()
+            self.pending[user_id] = future
+
+        if self.flush_task is None:
+            self.ready.clear()
+            self.flush_task = asyncio.create_task(self.flush())
+
+        # Every known user is waiting, no point to wait for the window to pass
+        if self.user_ids <= self.pending.keys():
+            self.ready.set()
+
+        return await asyncio.shield(future)
+
+    async def flush(self):
+        try:
+            await asyncio.wait_for(self.ready.wait(), self.window)
+        except asyncio.TimeoutError:
+            pass
+
+        pending, self.pending = self.pending, {}
+        self.flush_task = None
+
+        user_ids = sorted(pending)
+        batches = [
+            user_ids[i : i + BATCH_SIZE] for i in range(0, len(user_ids), BATCH_SIZE)
+        ]
+        logger.debug(
+            "Polling {} Twitch users in {} request(s)", len(user_ids), len(batches)
+        )
+
+        results = await asyncio.gather(
+            *(
+                self.client.get_streams(batch, log=False, conditional=True)
+                for batch in batches
+            ),
+            return_exceptions=True,
+        )
+
+        for batch, result in zip(batches, results):
+            if isinstance(result, BaseException):
+                for user_id in batch:
+                    pending[user_id].set_exception(result)
+                continue
+
+            streams = {stream.user_id: stream for stream in result}
+            for user_id in batch:
+                pending[user_id].set_result(streams.get(user_id))
+
+    async def get_user(self, login: str, store: CacheStore) -> TwitchUser:
+        """Resolve login, from the store or batched with other checkers."""
+
+        login = login.lower()
+        stored = store.get(f"{USER_PREFIX}{login}")
+        if stored and time.time() - stored["resolved_at"] < USERS_TTL:
+            return TwitchUser(id=stored["id"], login=login)
+
+        future = self.user_requests.get(login)
+        if future is None:
+            future = asyncio.get_running_loop().create_future()
+            self.user_requests[login] = future
+
+        if self.users_task is None:
+            self.users_ready.clear()
+            self.users_task = asyncio.create_task(self.flush_users(store))
+
+        # Every checker is waiting, no point to wait for the window to pass
+        self.user_waiters += 1
+        if self.user_waiters >= len(self.checkers):
+            self.users_ready.set()
+
+        return await asyncio.shield(future)
+
+    async def flush_users(self, store: CacheStore):
+        try:
+            await asyncio.wait_for(self.users_ready.wait(), self.window)
+        except asyncio.TimeoutError:
+            pass
+
+        requests, self.user_requests = self.user_requests, {}
+        self.user_waiters = 0
+        self.users_task = None
+
+        logins = sorted(requests)
+        batches = [
+            logins[i : i + BATCH_SIZE] for i in range(0, len(logins), BATCH_SIZE)
+        ]
+        logger.info(
+            "Resolving {} Twitch users in {} request(s)", len(logins), len(batches)
+        )
+
+        results = await asyncio.gather(
+            *(self.client.get_users(batch) for batch in batches),
+            return_exceptions=True,
+        )
+
+        resolved: Dict[str, TwitchUser] = {}
+        for batch, result in zip(batches, results):
+            if isinstance(result, BaseException):
+                for login in batch:
+                    requests[login].set_exception(result)
+                continue
+            resolved.update((user.login, user) for user in result)
+
+        now = time.time()
+        for login, user in resolved.items():
+            store.set(f"{USER_PREFIX}{login}", {"id": user.id, "resolved_at": now})
+
+        for login, future in requests.items():
+            if future.done():
+                continue
+            if login in resolved:
+                future.set_result(resolved[login])
+            else:
+                future.set_exception(RuntimeError(f"Twitch user {login} not found"))
+
+    def attach(self, checker):
+        self.checkers.add(checker)
+
+    async def detach(self, checker, user_id: Optional[str] = None):
+        self.checkers.discard(checker)
+        if user_id and not any(
+            other.user and other.user.id == user_id for other in self.checkers
+        ):
+            self.user_ids.discard(user_id)
+
+        await registry.release(self.key)
+
+    async def close(self):
+        await self.client.close()
+
+
+def get_poller(
+    client_id: str, client_secret: str, timeout: float = 10, window: float = 0.5
+) -> TwitchStreamPoller:
+    """Get the poller shared by every checker with the same app credentials.
+
+    Every call has to be paired with detach(), the last one closes the client."""
+
+    key = ("twitch", client_id, client_secret)
+
+    def factory():
+        client = TwitchClient(client_id, client_secret, timeout=timeout)
+        return TwitchStreamPoller(key, client, window=window)
+
+    return registry.acquire(key, factory)
@@ -2,14 +2,23 @@
 Simple Twitch API wrapper of what I frequently use.
 """
 
+import json
 import time
 from datetime import datetime
 from pprint import pformat
-from typing import Dict, List, Union
+from typing import List, Optional, Tuple, Union
+from urllib.parse import urlencode
 
-import requests
+import aiohttp
 from loguru import logger
 
+from stream_notifier.credentials import CredentialManager
+from stream_notifier.http import validator_cache
+from stream_notifier.metrics import UPSTREAM_RESPONSES
+
+API_URL = "https://api.twitch.tv/helix"
+TOKEN_URL = "https://id.twitch.tv/oauth2/token"
+
 
 class TwitchGame:
     def __init__(self, **kwargs):
@@ -85,55 +94,129 @@ class TwitchChannel:
         return vars(self)
 
 
-class TwitchClient:
-    def __init__(self, client_id: str, client_secret: str):
-        self.client_id = client_id
-        self.client_secret = client_secret
+class TwitchResponse:
+    """Buffered response, so the connection can go back to the pool right away."""
+
+    def __init__(self, url: str, status: int, text: str, etag: Optional[str] = None):
+        self.url = url
+        self.status = status
+        self.text = text
+        self.etag = etag
 
-        self.header: Dict[str, str] = {}
-        self.next_check: int = 0
+    def __repr__(self):
+        return f"<TwitchResponse [{self.status}]>"
 
-        self.session: requests.Session = requests.session()
+    def json(self):
+        return json.loads(self.text)
 
-        self.generate_new_header()
 
-    def _get_new_token(self) -> str:
-        req_url = f"https://id.twitch.tv/oauth2/token?client_id={self.client_id}" \
-                  f"&client_secret={self.client_secret}" \
-                  f"&grant_type=client_credentials"
+class TwitchClient:
+    def __init__(self, client_id: str, client_secret: str, timeout: float = 10):
+        self.client_id = client_id
+        self.client_secret = client_secret
+        self.timeout = aiohttp.ClientTimeout(total=timeout)
+
+        self.credentials = CredentialManager(
+            f"Twitch app {client_id}", self._get_new_token
+        )
+
+        self._session: Optional[aiohttp.ClientSession] = None
+
+    @property
+    def session(self) -> aiohttp.ClientSession:
+        # Session has to be created inside a running event loop
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(timeout=self.timeout)
+        return self._session
+
+    async def close(self):
+        await self.credentials.close()
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def _get_new_token(self) -> Tuple[str, float]:
+        params = {
+            "client_id": self.client_id,
+            "client_secret": self.client_secret,
+            "grant_type": "client_credentials",
+        }
 
-        logger.debug("Sending request: \n{}", req_url)
+        logger.debug("Sending request: \n{}", TOKEN_URL)
 
-        req = self.session.post(req_url)
-        logger.debug("response: {}", req)
+        async with self.session.post(
+            TOKEN_URL, params=params, timeout=self.timeout
+        ) as req:
+            logger.debug("response: {}", req)
+            UPSTREAM_RESPONSES.inc(service="twitch", status=req.status)
+            dict_ = await req.json()
 
-        dict_ = req.json()
         logger.debug("Received: \n{}", pformat(dict_, indent=2))
 
         token: str = dict_["access_token"]
         expires_in: int = dict_["expires_in"]
 
-        self.next_check = time.time() + (expires_in // 2)
         logger.debug("Received token [{}] with lifespan of {} seconds.", token, expires_in)
 
-        return token
+        return token, time.time() + expires_in
 
-    def generate_new_header(self):
+    async def _request(self, method: str, endpoint: str, headers=None, **kwargs):
+        """Send an API request, retrying once with a new token if it got rejected."""
 
-        if time.time() < self.next_check:
-            return
+        for retry in (True, False):
+            token = await self.credentials.get()
+            request_headers = {
+                "Authorization": f"Bearer {token}",
+                "Client-ID": f"{self.client_id}",
+            }
 
-        logger.info("Generating new header")
+            async with self.session.request(
+                method,
+                f"{API_URL}/{endpoint}",
+                headers=request_headers | (headers or {}),
+                timeout=self.timeout,
+                **kwargs,
+            ) as req:
+                response = TwitchResponse(
+                    str(req.url),
+                    req.status,
+                    await req.text(),
+                    req.headers.get("ETag"),
+                )
+            UPSTREAM_RESPONSES.inc(service="twitch", status=response.status)
 
-        header = {
-            "Authorization": f"Bearer {self._get_new_token()}",
-            "Client-ID": f"{self.client_id}"
-        }
+            if response.status != 401 or not retry:
+                return response
 
-        self.header = header
+            await self.credentials.invalidate(token)
+
+    async def _get(
+        self, endpoint: str, params, conditional=False, cache_key=None
+    ) -> TwitchResponse:
+        """If conditional, raises NotModified when the response didn't change.
+
+        cache_key identifies the request for that, the params by default."""
+
+        if not conditional:
+            return await self._request("GET", endpoint, params=params)
+
+        key = f"twitch:{self.client_id}:{endpoint}?{cache_key or urlencode(params)}"
+        response = await self._request(
+            "GET", endpoint, headers=validator_cache.headers(key), params=params
+        )
+
+        if response.status == 304:
+            raise validator_cache.not_modified(key)
+        if response.status == 200:
+            validator_cache.store(key, response.etag, len(response.text))
+
+        return response
+
+    async def _post(self, endpoint: str, payload: dict) -> TwitchResponse:
+        return await self._request("POST", endpoint, json=payload)
 
     @staticmethod
-    def _check_and_raise_error(req: requests.Response, log_response=True):
+    def _check_and_raise_error(req: TwitchResponse, log_response=True):
         try:
             json_ = req.json()
         except Exception:
@@ -143,7 +226,7 @@ class TwitchClient:
         if log_response:
             logger.debug("response: {}\n{}", req, pformat(json_, indent=2))
 
-        if req.status_code != 200:
+        if req.status != 200:
             raise RuntimeError(f"Got Problem calling API, Response:\n{pformat(json_, indent=2)}")
 
         if not json_["data"]:
@@ -161,37 +244,36 @@ class TwitchClient:
         logger.warning("Could not find exact match of user {}", value)
         raise RuntimeError(f"Can't find exact match of user {value}")
 
-    def get_user(self, user_name) -> TwitchUser:
-        self.generate_new_header()
-
-        req_url = f"https://api.twitch.tv/helix/users?&login={user_name}"
-
-        req = self.session.get(req_url, headers=self.header)
-        logger.info(req_url)
+    async def get_user(self, user_name) -> TwitchUser:
+        req = await self._get("users", {"login": user_name})
+        logger.info(req.url)
 
         self._check_and_raise_error(req)
 
         return TwitchUser(**self._exact_match(req, "login", user_name))
 
-    def get_channel(self, channel_id) -> TwitchChannel:
-        self.generate_new_header()
+    async def get_users(self, user_names) -> List[TwitchUser]:
+        """Get up to 100 users by login in a single request."""
 
-        req_url = f"https://api.twitch.tv/helix/channels?broadcaster_id={channel_id}"
+        req = await self._get("users", [("login", name) for name in user_names])
+        logger.info(req.url)
 
-        req = self.session.get(req_url, headers=self.header)
-        logger.info(req_url)
+        if self._check_and_raise_error(req, log_response=False):
+            return [TwitchUser(**data) for data in req.json()["data"]]
 
-        self._check_and_raise_error(req)
+        return []
 
-        return TwitchChannel(**req.json()["data"][0])
+    async def get_channel(self, channel_id) -> TwitchChannel:
+        req = await self._get("channels", {"broadcaster_id": channel_id})
+        logger.info(req.url)
 
-    def search_channel(self, channel_name) -> Union[TwitchChannel, None]:
-        self.generate_new_header()
+        self._check_and_raise_error(req)
 
-        req_url = f"https://api.twitch.tv/helix/search/channels?query={channel_name}"
+        return TwitchChannel(**req.json()["data"][0])
 
-        req = self.session.get(req_url, headers=self.header)
-        logger.info(req_url)
+    async def search_channel(self, channel_name) -> Union[TwitchChannel, None]:
+        req = await self._get("search/channels", {"query": channel_name})
+        logger.info(req.url)
 
         try:
             matched = self._exact_match(req, "broadcaster_login", channel_name)
@@ -204,32 +286,77 @@ class TwitchClient:
 
         return None
 
-    def get_stream(self, user_id, log=True) -> Union[TwitchChannel, None]:
-        self.generate_new_header()
-
-        req_url = f"https://api.twitch.tv/helix/streams?user_id={user_id}"
-
-        req = self.session.get(req_url, headers=self.header)
+    async def get_stream(self, user_id, log=True) -> Union[TwitchChannel, None]:
+        req = await self._get("streams", {"user_id": user_id})
         if log:
-            logger.info(req_url)
+            logger.info(req.url)
 
         if self._check_and_raise_error(req, log):
             return TwitchChannel(**req.json()["data"][0])
 
         return None
 
-    def get_game(self, game_id="", game_name="") -> TwitchGame:
-        self.generate_new_header()
+    async def get_streams(
+        self, user_ids, log=True, conditional=False
+    ) -> List[TwitchChannel]:
+        """Get live streams of up to 100 users in a single request.
+
+        If conditional, raises NotModified when nothing changed since the last call."""
+
+        # Same users in any order are the same request, and share the same ETag
+        user_ids = sorted(set(user_ids))
+        params = [("user_id", user_id) for user_id in user_ids]
+        params.append(("first", str(len(user_ids))))
+
+        req = await self._get(
+            "streams",
+            params,
+            conditional=conditional,
+            cache_key="user_id=" + ",".join(user_ids),
+        )
+        if log:
+            logger.info(req.url)
+
+        if self._check_and_raise_error(req, log):
+            return [TwitchChannel(**data) for data in req.json()["data"]]
+
+        return []
+
+    async def create_eventsub_subscription(
+        self, type_: str, version: str, condition: dict, callback: str, secret: str
+    ) -> bool:
+        """Subscribe to an EventSub event with webhook transport.
+
+        Returns False if the same subscription already exists."""
+
+        payload = {
+            "type": type_,
+            "version": version,
+            "condition": condition,
+            "transport": {"method": "webhook", "callback": callback, "secret": secret},
+        }
+
+        req = await self._post("eventsub/subscriptions", payload)
+        logger.info("{} {}", req.url, type_)
+
+        if req.status == 409:
+            return False
+
+        if req.status != 202:
+            raise RuntimeError(f"Got Problem subscribing {type_}, Response:\n{req.text}")
+
+        return True
 
+    async def get_game(self, game_id="", game_name="") -> TwitchGame:
         if game_id:
-            req_url = f"https://api.twitch.tv/helix/games?id={game_id}"
+            params = {"id": game_id}
         elif game_name:
-            req_url = f"https://api.twitch.tv/helix/games?name={game_id}"
+            params = {"name": game_name}
         else:
             raise RuntimeError("Provide either non-empty game_id or game_name.")
 
-        req = self.session.get(req_url, headers=self.header)
-        logger.info(req_url)
+        req = await self._get("games", params)
+        logger.info(req.url)
 
         self._check_and_raise_error(req)
 
@@ -1,5 +1,6 @@
 import tweepy
 import tweepy.models
+from loguru import logger
 from pydantic import Field, field_validator
 
 from stream_notifier.model import BaseModel, Color
@@ -7,6 +8,9 @@ from stream_notifier.utils import flatten_dict
 
 from .base import CheckerBase, CheckerConfig
 
+# Maximum tweets per home_timeline request
+TIMELINE_COUNT = 200
+
 
 class TwitterCheckerPushRule(BaseModel):
     username: str | list[str]
@@ -50,12 +54,18 @@ class TwitterChecker(CheckerBase):
 
     async def run_check(self, last_notified):
         # Use home_timeline instead of user_timeline due to Twitter's new restrictions
-        tweets = self.api.home_timeline(tweet_mode="extended")
         if not last_notified.id:
+            tweets = self.api.home_timeline(tweet_mode="extended", count=1)
             return tweets[0]._json
-        for tweet in reversed(tweets):
-            if last_notified.id < tweet.id:
-                return tweet._json
+
+        # Only fetch tweets after the last notified one, newest first
+        tweets = self.api.home_timeline(
+            tweet_mode="extended", since_id=last_notified.id, count=TIMELINE_COUNT
+        )
+        if len(tweets) == TIMELINE_COUNT:
+            logger.warning("Timeline may have more than {} new tweets", TIMELINE_COUNT)
+
+        return [tweet._json for tweet in reversed(tweets)]
 
     async def process_result(self, info):
         flatten_dict(info, "user")
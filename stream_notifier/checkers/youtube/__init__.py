@@ -1,11 +1,33 @@
+import asyncio
+import datetime
+import time
 from typing import Optional
 
 from loguru import logger
+from pydantic import HttpUrl
 
-from stream_notifier.model import Color
+from stream_notifier.model import BaseModel, Color
+from stream_notifier.registry import registry
 
 from ..base import CheckerBase, CheckerConfig
-from .youtube_api_client import build_client
+from .websub import TOPIC_URL, WebSubSubscriber, get_endpoint
+from .youtube_api_client import Video, build_async_client
+
+# Upcoming videos are looked up again this often once their scheduled start has
+# passed, until they go live or are that late
+START_RECHECK_DELAY = 60
+START_GRACE = datetime.timedelta(hours=1)
+
+
+class WebSub(BaseModel):
+    channel_id: str
+    # Public URL routed to the built-in HTTP server, its path is served locally
+    callback_url: HttpUrl
+    secret: Optional[str] = None
+    hub_url: HttpUrl = "https://pubsubhubbub.appspot.com/subscribe"
+    lease_seconds: int = 432000
+    # Polling only reconciles missed notifications in WebSub mode
+    reconcile_interval: int = 600
 
 
 class YoutubeCheckerConfig(CheckerConfig):
@@ -13,9 +35,34 @@ class YoutubeCheckerConfig(CheckerConfig):
     check_interval: int = 10
     client_secret: str
     token: Optional[str] = None
+    api_workers: int = 2
+    api_timeout: float = 30
+    websub: Optional[WebSub] = None
+    # How often upcoming broadcasts are fetched for adaptive polling
+    upcoming_refresh_interval: int = 900
+
+    @property
+    def client_key(self):
+        return (
+            "youtube",
+            self.client_secret,
+            self.token,
+            self.api_workers,
+            self.api_timeout,
+        )
 
     def create_client(self):
-        return build_client(client_secret=self.client_secret, token=self.token)
+        """Get the client shared by every checker with the same credentials."""
+
+        return registry.acquire(
+            self.client_key,
+            lambda: build_async_client(
+                client_secret=self.client_secret,
+                token=self.token,
+                max_workers=self.api_workers,
+                timeout=self.api_timeout,
+            ),
+        )
 
 
 class YoutubeChecker(CheckerBase):
@@ -24,8 +71,134 @@ class YoutubeChecker(CheckerBase):
         self.client = self.config.create_client()
         logger.info("Application successfully authorized.")
 
+        self.trigger = None
+        self.pending = []
+        self.confirm_tasks = set()
+        self.subscriber = None
+        self.endpoint = None
+        self.upcoming_starts = {}
+        self.upcoming_checked = 0
+        # video_id -> timer looking the video up again at its scheduled start
+        self.start_timers = {}
+
+        if self.config.websub:
+            websub = self.config.websub
+            self.subscriber = WebSubSubscriber(
+                str(websub.hub_url),
+                TOPIC_URL.format(websub.channel_id),
+                str(websub.callback_url),
+                self.on_videos,
+                secret=websub.secret,
+                lease_seconds=websub.lease_seconds,
+            )
+            self.endpoint = get_endpoint(str(websub.callback_url))
+            self.endpoint.add(self.subscriber)
+
+    def poll_interval(self, interval):
+        # Until the hub has verified the subscription, polling is the only way to
+        # notice streams
+        if self.subscriber and self.subscriber.active:
+            return self.config.websub.reconcile_interval
+        return interval
+
+    async def start(self, trigger):
+        self.trigger = trigger
+        if self.subscriber:
+            self.subscriber.start()
+
+    def on_videos(self, video_ids):
+        task = asyncio.create_task(self.confirm_live(video_ids))
+        self.confirm_tasks.add(task)
+        task.add_done_callback(self.confirm_tasks.discard)
+
+    async def confirm_live(self, video_ids):
+        try:
+            videos = await self.client.get_videos_info(
+                *video_ids, part="snippet,status,liveStreamingDetails"
+            )
+        except Exception:
+            logger.exception("Failed to look up videos {}", video_ids)
+            return
+
+        for video in videos:
+            if video.is_upcoming and video.scheduled_start_time:
+                start = video.scheduled_start_time.parse()
+                self.upcoming_starts[video.video_id] = start
+                self.confirm_at_start(video.video_id, start)
+            else:
+                self.cancel_start_timer(video.video_id)
+
+        live = [self.video_info(video) for video in videos if video.is_live]
+        if live and self.trigger:
+            self.pending.extend(live)
+            self.trigger()
+
+    def confirm_at_start(self, video_id, start):
+        """Look an upcoming video up again when it is scheduled to start.
+
+        No notification is sent when it goes live, and the next check may be
+        a reconcile interval away."""
+
+        self.cancel_start_timer(video_id)
+        now = datetime.datetime.now(datetime.timezone.utc)
+        if now > start + START_GRACE:
+            return
+
+        delay = (start - now).total_seconds()
+        if delay <= 0:
+            # Not live yet, or not on time
+            delay = START_RECHECK_DELAY
+
+        loop = asyncio.get_running_loop()
+        self.start_timers[video_id] = loop.call_later(delay, self.on_videos, [video_id])
+
+    def cancel_start_timer(self, video_id):
+        timer = self.start_timers.pop(video_id, None)
+        if timer is not None:
+            timer.cancel()
+
+    @staticmethod
+    def video_info(video: Video):
+        """Same fields as LiveBroadcast.as_dict, from a single video lookup."""
+
+        return {
+            "kind": video.json.get("kind"),
+            "etag": video.json.get("etag"),
+            "id": video.video_id,
+            "life_cycle_status": "live",
+            "privacy_status": video.privacy_status,
+            "published_at": video.published_at,
+            "channel_id": video.channel_id,
+            "title": video.title,
+            "description": video.description,
+            "scheduled_start_time": video.scheduled_start_time,
+            "actual_start_time": video.actual_start_time,
+            "link": f"https://www.youtube.com/watch?v={video.video_id}",
+            "link_short": f"https://youtu.be/{video.video_id}",
+            "is_live": True,
+        }
+
+    async def expected_starts(self):
+        if time.time() - self.upcoming_checked > self.config.upcoming_refresh_interval:
+            self.upcoming_checked = time.time()
+            upcoming = await self.client.get_upcoming_user_broadcasts()
+            self.upcoming_starts = {
+                broadcast.id: broadcast.scheduled_start_time.parse()
+                for broadcast in upcoming
+                if broadcast.scheduled_start_time
+            }
+
+        return list(self.upcoming_starts.values())
+
     async def run_check(self, last_notified):
-        active = self.client.get_active_user_broadcasts(max_results=1)
+        # Videos confirmed live from WebSub notifications
+        if self.pending:
+            pending, self.pending = self.pending, []
+            return pending
+
+        active = await self.client.get_active_user_broadcasts(
+            max_results=1, conditional=True
+        )
         if active:
             # gotcha! there's active stream
             stream = active[0]
@@ -33,6 +206,20 @@ class YoutubeChecker(CheckerBase):
             logger.debug("Found Active stream: {}", stream)
             return stream.as_dict()
 
+    async def close(self):
+        for video_id in list(self.start_timers):
+            self.cancel_start_timer(video_id)
+        if self.subscriber:
+            self.subscriber.stop()
+            self.endpoint.remove(self.subscriber)
+        await registry.release(self.config.client_key)
+
+    def fingerprint(self, result):
+        # The API already tells whether the broadcast resource changed
+        if isinstance(result, dict) and result.get("etag"):
+            return result["etag"]
+        return super().fingerprint(result)
+
     async def process_result(self, info):
         if info.description:
             description = info.description.strip().split("\n")
@@ -0,0 +1,187 @@
+"""
+WebSub (PubSubHubbub) subscriber of YouTube channel feeds.
+
+https://developers.google.com/youtube/v3/guides/push_notifications
+"""
+
+import asyncio
+import hashlib
+import hmac
+import time
+from typing import Callable, Optional
+from urllib.parse import urlparse
+
+import feedparser
+from aiohttp import web
+from loguru import logger
+
+from stream_notifier.http import get_session
+from stream_notifier.server import server
+
+TOPIC_URL = "https://www.youtube.com/xml/feeds/videos.xml?channel_id={}"
+
+# Retry delay when subscribing fails
+RETRY_DELAY = 60
+
+
+def sign_body(secret: str, body: bytes) -> str:
+    """Compute the X-Hub-Signature header value of a notification."""
+
+    return "sha1=" + hmac.new(secret.encode(), body, hashlib.sha1).hexdigest()
+
+
+class WebSubSubscriber:
+    def __init__(
+        self,
+        hub_url: str,
+        topic: str,
+        callback_url: str,
+        on_videos: Callable[[list[str]], None],
+        secret: Optional[str] = None,
+        lease_seconds: int = 432000,
+    ):
+        self.hub_url = hub_url
+        self.topic = topic
+        self.callback_url = callback_url
+        self.on_videos = on_videos
+        self.secret = secret
+        self.lease_seconds = lease_seconds
+        self.renew_task: Optional[asyncio.Task] = None
+        # Set when the hub verifies the subscription, until its lease runs out
+        self.verified_until = 0.0
+
+    @property
+    def active(self) -> bool:
+        """Whether the hub verified the subscription and its lease is still running."""
+
+        return time.time() < self.verified_until
+
+    def verified(self, mode: str, lease_seconds: Optional[str]):
+        if mode == "subscribe":
+            lease = int(lease_seconds) if lease_seconds else self.lease_seconds
+            self.verified_until = time.time() + lease
+        else:
+            self.verified_until = 0.0
+
+    async def subscribe(self, mode="subscribe"):
+        data = {
+            "hub.callback": self.callback_url,
+            "hub.topic": self.topic,
+            "hub.verify": "async",
+            "hub.mode": mode,
+            "hub.lease_seconds": str(self.lease_seconds),
+        }
+        if self.secret:
+            data["hub.secret"] = self.secret
+
+        async with get_session().post(self.hub_url, data=data) as response:
+            if response.status not in (202, 204):
+                raise RuntimeError(
+                    f"WebSub {mode} failed with {response.status}: "
+                    f"{await response.text()}"
+                )
+
+        logger.info("Requested WebSub {} of {}", mode, self.topic)
+
+    async def renew_forever(self):
+        while True:
+            try:
+                await self.subscribe()
+            except Exception:
+                logger.exception("Failed to subscribe {}", self.topic)
+                await asyncio.sleep(RETRY_DELAY)
+                continue
+
+            # Renew well before the lease runs out
+            await asyncio.sleep(self.lease_seconds * 0.8)
+
+    def start(self):
+        self.renew_task = asyncio.create_task(self.renew_forever())
+
+    def stop(self):
+        if self.renew_task is not None:
+            self.renew_task.cancel()
+
+    def verify_signature(self, body: bytes, signature: str) -> bool:
+        if not self.secret:
+            return True
+        return hmac.compare_digest(sign_body(self.secret, body), signature)
+
+
+class WebSubEndpoint:
+    """Serves every subscription using one callback path, routed by topic."""
+
+    def __init__(self):
+        # topic -> subscribers of every checker watching it
+        self.subscribers: dict[str, list[WebSubSubscriber]] = {}
+
+    def add(self, subscriber: WebSubSubscriber):
+        self.subscribers.setdefault(subscriber.topic, []).append(subscriber)
+
+    def remove(self, subscriber: WebSubSubscriber):
+        subscribers = self.subscribers.get(subscriber.topic, [])
+        if subscriber in subscribers:
+            subscribers.remove(subscriber)
+        if not subscribers:
+            self.subscribers.pop(subscriber.topic, None)
+
+    async def handle_verify(self, request: web.Request) -> web.Response:
+        query = request.query
+        topic = query.get("hub.topic")
+        if topic not in self.subscribers:
+            logger.warning("WebSub verification of unknown topic {}", topic)
+            return web.Response(status=404)
+
+        logger.info(
+            "WebSub {} of {} verified, lease {} seconds",
+            query.get("hub.mode"),
+            topic,
+            query.get("hub.lease_seconds"),
+        )
+        for subscriber in self.subscribers[topic]:
+            subscriber.verified(query.get("hub.mode"), query.get("hub.lease_seconds"))
+        return web.Response(text=query.get("hub.challenge", ""))
+
+    async def handle_notify(self, request: web.Request) -> web.Response:
+        body = await request.read()
+        signature = request.headers.get("X-Hub-Signature", "")
+
+        # Deleted entries have no channel, nothing to look up for them
+        videos: dict[str, list[str]] = {}
+        for entry in feedparser.parse(body).entries:
+            if "yt_videoid" in entry and "yt_channelid" in entry:
+                topic = TOPIC_URL.format(entry.yt_channelid)
+                videos.setdefault(topic, []).append(entry.yt_videoid)
+
+        for topic, video_ids in videos.items():
+            subscribers = self.subscribers.get(topic)
+            if not subscribers:
+                logger.warning("WebSub notification of unknown topic {}", topic)
+                continue
+
+            logger.info("WebSub notification for videos {}", video_ids)
+            for subscriber in subscribers:
+                if subscriber.verify_signature(body, signature):
+                    subscriber.on_videos(video_ids)
+                else:
+                    # Hubs expect a success response even when the message is ignored
+                    logger.warning("Ignored WebSub notification with invalid signature")
+
+        return web.Response(status=204)
+
+
+# Callback path -> endpoint, shared by every checker using the path
+_endpoints: dict[str, WebSubEndpoint] = {}
+
+
+def get_endpoint(callback_url: str) -> WebSubEndpoint:
+    """Get the endpoint of the path of callback_url, registering its routes once."""
+
+    path = urlparse(callback_url).path
+    endpoint = _endpoints.get(path)
+    if endpoint is None:
+        endpoint = _endpoints[path] = WebSubEndpoint()
+        server.add_route("GET", path, endpoint.handle_verify)
+        server.add_route("POST", path, endpoint.handle_notify)
+
+    return endpoint
@@ -5,20 +5,29 @@ You can manually specify it when building resource file.
 
 Readability is 'amazing', even I can't read well. Will add docstrings when I can.
 """
+import asyncio
 import datetime
-import inspect
 import json
 import os
-from typing import Tuple, Union
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from functools import partial
+from typing import Callable, Optional, Tuple, Union
 
 import googleapiclient.discovery
 import googleapiclient.errors
+import httplib2
 from dateutil.parser import isoparse
 from google.auth.exceptions import RefreshError
 from google.auth.transport.requests import Request
 from google.oauth2.credentials import Credentials
 from google_auth_oauthlib.flow import InstalledAppFlow
 
+from stream_notifier.credentials import CredentialManager
+from stream_notifier.http import validator_cache
+from stream_notifier.metrics import UPSTREAM_RESPONSES
+
 scopes = ["https://www.googleapis.com/auth/youtube.readonly"]
 
 
@@ -26,14 +35,9 @@ API_SERV_NAME = "youtube"
 API_VERSION = "v3"
 
 
-def build_client(
-    api_key=None,
-    client_secret=None,
-    token=None,
-    secure=True,
-) -> "YoutubeClient":
+def authorize(api_key=None, client_secret=None, token=None, secure=True):
     """
-    Builds authenticated Youtube client wrapper.
+    Resolves builder config and OAuth credentials, running the login flow if needed.
 
     Args:
         api_key: Google Data API key
@@ -42,7 +46,7 @@ def build_client(
         secure: Enables Https request.
 
     Returns:
-        YoutubeClient object
+        Tuple of builder config dict and credentials
     """
 
     # config dict to feed on builder
@@ -78,176 +82,236 @@ def build_client(
 
     # check parameters end ------
 
+    return config, credential
+
+
+def build_client(
+    api_key=None,
+    client_secret=None,
+    token=None,
+    secure=True,
+) -> "YoutubeClient":
+    """
+    Builds authenticated Youtube client wrapper.
+
+    Args:
+        api_key: Google Data API key
+        client_secret_dir: client secret file to load from.
+        token: Oauth token to create credentials from (json string)
+        secure: Enables Https request.
+
+    Returns:
+        YoutubeClient object
+    """
+
+    config, credential = authorize(api_key, client_secret, token, secure)
+
     youtube = googleapiclient.discovery.build(**config, credentials=credential)
     return YoutubeClient(youtube, credential)
 
 
-class LazyProperty:
-    # python cookbook 3E
+def build_async_client(
+    api_key=None,
+    client_secret=None,
+    token=None,
+    secure=True,
+    max_workers=2,
+    timeout=30,
+) -> "AsyncYoutubeClient":
+    """
+    Builds authenticated Youtube client wrapper usable from asyncio.
 
-    def __init__(self, func):
-        self.func = func
+    Args:
+        api_key: Google Data API key
+        client_secret_dir: client secret file to load from.
+        token: Oauth token to create credentials from (json string)
+        secure: Enables Https request.
+        max_workers: Maximum number of API calls running at the same time.
+        timeout: Seconds before an API call is abandoned.
 
-    def __get__(self, instance, owner):
-        if instance is None:
-            return self
-        else:
-            value = self.func(instance)
-            setattr(instance, self.func.__name__, value)
-            return value
+    Returns:
+        AsyncYoutubeClient object
+    """
 
+    config, credential = authorize(api_key, client_secret, token, secure)
 
-class LiveStream:
-    def __init__(self, dict_: dict):
-        self.json = dict_
+    async def refresher():
+        await asyncio.to_thread(credential.refresh, Request())
+        return credential.token, _expiry_timestamp(credential)
 
-        self.status = self.json["status"]["streamStatus"]
-        self.title = self.json["snippet"]["title"]
-        self.description = self.json["snippet"]["description"]
-        self.published_at = self.json["snippet"]["description"]
+    credentials = CredentialManager(
+        "YouTube", refresher, credential.token, _expiry_timestamp(credential)
+    )
 
-    @property
-    def pub_date(self):
-        return isoparse(self.published_at)
+    def factory():
+        # Socket timeout frees the worker thread even if the call was abandoned.
+        # Requests carry the token of the credential manager, which is the only
+        # one refreshing it: google-auth would refresh inline in worker threads
+        http = _TokenHttp(credentials, timeout=timeout)
+        youtube = googleapiclient.discovery.build(**config, http=http)
+        return YoutubeClient(youtube, credential)
 
-    @property
-    def is_live(self):
-        return self.status == "active"
+    return AsyncYoutubeClient(
+        factory, max_workers=max_workers, timeout=timeout, credentials=credentials
+    )
 
 
-class LiveBroadcast:
-    def __init__(self, dict_: dict):
-        self.json = dict_
-        self.status = self.json["status"]
-        self.snippet = self.json["snippet"]
-
-        # basic ----
-        self.kind = self.json["kind"]
-        self.etag = self.json["etag"]
-        self.id = self.json["id"]
-
-        # status ---
-        self.life_cycle_status = self.status.get("lifeCycleStatus", None)
-        self.privacy_status = self.status.get("privacyStatus", None)
-        self.recording_status = self.status.get("recordingStatus", None)
-        self.made_for_kids = self.status.get("madeForKids", None)
-        self.self_declared_made_for_kids = self.status.get(
-            "selfDeclaredMadeForKids", None
-        )
+class _TokenHttp(httplib2.Http):
+    """Sends the current token of a CredentialManager, never refreshing it."""
 
-        # snippet ---
-        self._published_at = self.snippet.get("publishedAt", None)
-        self.channel_id = self.snippet.get("channelId", None)
-        self.title = self.snippet.get("title", None)
-        self.description = self.snippet.get("description", None)
+    def __init__(self, credentials: CredentialManager, **kwargs):
+        super().__init__(**kwargs)
+        self.credentials = credentials
 
-        self._thumbnail = self.snippet.get("thumbnails", None)
-        self._scheduled_start_time: str = self.snippet.get("scheduledStartTime", None)
-        self._scheduled_end_time: str = self.snippet.get("scheduled_end_time", None)
-        self._actual_start_time: str = self.snippet.get("actualStartTime", None)
-        self._actual_end_time: str = self.snippet.get("actualEndTime", None)
+    def request(self, uri, method="GET", body=None, headers=None, *args, **kwargs):
+        headers = dict(headers or {})
+        headers["authorization"] = f"Bearer {self.credentials.token}"
 
-        self.is_default_broadcast: bool = self.snippet.get("isDefaultBroadcast", None)
-        self.live_chat_id: str = self.snippet.get("liveChatId", None)
+        response, content = super().request(uri, method, body, headers, *args, **kwargs)
+        UPSTREAM_RESPONSES.inc(service="youtube", status=response.status)
+        return response, content
 
-    def __str__(self):
-        return f"<LiveBroadcast instance of stream {self.id}>"
 
-    @LazyProperty
-    def link(self):
-        """
-        This is Property - access like an attribute
+def _expiry_timestamp(credential: Credentials) -> Optional[float]:
+    if credential.expiry is None:
+        return None
 
-        Returns:
-            url of the stream
-        """
+    # google-auth keeps expiry as naive UTC
+    return credential.expiry.replace(tzinfo=datetime.timezone.utc).timestamp()
 
-        return f"https://www.youtube.com/watch?v={self.id}"
 
-    @LazyProperty
-    def link_short(self):
-        """
-        This is Property - access like an attribute
+class IsoDateTime(str):
+    """
+    ISO 8601 timestamp kept as string, so it stays JSON serializable.
 
-        Returns:
-            short url of the stream (youtu.be)
-        """
+    Only parsed when formatted into a template, where it renders like a datetime
+    and accepts datetime format specs - e.g. "{actual_start_time:%H:%M}".
+    """
 
-        return f"https://youtu.be/{self.id}"
+    __slots__ = ()
 
-    @LazyProperty
-    def published_at(self):
-        """
-        This is Property - access like an attribute
+    def parse(self) -> datetime.datetime:
+        return isoparse(self)
 
-        Returns:
-            Timezone-aware datetime object or None
-        """
+    def __format__(self, format_spec):
+        return format(self.parse(), format_spec)
 
-        if self._published_at:
-            return isoparse(self._published_at)
-        return None
 
-    @LazyProperty
-    def scheduled_start_time(self):
-        """
-        This is Property - access like an attribute
+def _iso_or_none(value) -> Optional[IsoDateTime]:
+    return IsoDateTime(value) if value else None
 
-        Returns:
-            Timezone-aware datetime object or None
-        """
 
-        if self._scheduled_start_time:
-            return isoparse(self._scheduled_start_time)
-        return None
+@dataclass(slots=True)
+class LiveStream:
+    json: dict = field(repr=False)
+    status: str
+    title: str
+    description: str
+    published_at: Optional[IsoDateTime]
+
+    @classmethod
+    def from_json(cls, dict_: dict) -> "LiveStream":
+        return cls(
+            json=dict_,
+            status=dict_["status"]["streamStatus"],
+            title=dict_["snippet"]["title"],
+            description=dict_["snippet"]["description"],
+            published_at=_iso_or_none(dict_["snippet"].get("publishedAt")),
+        )
 
-    @LazyProperty
-    def scheduled_end_time(self):
-        """
-        This is Property - access like an attribute
+    @property
+    def pub_date(self):
+        return self.published_at.parse()
 
-        Returns:
-            Timezone-aware datetime object or None
-        """
+    @property
+    def is_live(self):
+        return self.status == "active"
 
-        if self._scheduled_end_time:
-            return isoparse(self._scheduled_end_time)
-        return None
+    def as_dict(self):
+        return {
+            "status": self.status,
+            "title": self.title,
+            "description": self.description,
+            "published_at": self.published_at,
+            "is_live": self.is_live,
+        }
 
-    @LazyProperty
-    def actual_start_time(self):
-        """
-        This is Property - access like an attribute
 
-        Returns:
-            Timezone-aware datetime object or None
-        """
+@dataclass(slots=True)
+class LiveBroadcast:
+    json: dict = field(repr=False)
+
+    # basic ----
+    kind: str
+    etag: str
+    id: str
+
+    # status ---
+    life_cycle_status: Optional[str]
+    privacy_status: Optional[str]
+    recording_status: Optional[str]
+    made_for_kids: Optional[bool]
+    self_declared_made_for_kids: Optional[bool]
+
+    # snippet ---
+    published_at: Optional[IsoDateTime]
+    channel_id: Optional[str]
+    title: Optional[str]
+    description: Optional[str]
+    scheduled_start_time: Optional[IsoDateTime]
+    scheduled_end_time: Optional[IsoDateTime]
+    actual_start_time: Optional[IsoDateTime]
+    actual_end_time: Optional[IsoDateTime]
+    is_default_broadcast: Optional[bool]
+    live_chat_id: Optional[str]
+    thumbnail: Optional[dict] = field(repr=False)
+
+    @classmethod
+    def from_json(cls, dict_: dict) -> "LiveBroadcast":
+        status = dict_["status"]
+        snippet = dict_["snippet"]
 
-        if self._actual_start_time:
-            return isoparse(self._actual_start_time)
-        return None
+        return cls(
+            json=dict_,
+            kind=dict_["kind"],
+            etag=dict_["etag"],
+            id=dict_["id"],
+            life_cycle_status=status.get("lifeCycleStatus"),
+            privacy_status=status.get("privacyStatus"),
+            recording_status=status.get("recordingStatus"),
+            made_for_kids=status.get("madeForKids"),
+            self_declared_made_for_kids=status.get("selfDeclaredMadeForKids"),
+            published_at=_iso_or_none(snippet.get("publishedAt")),
+            channel_id=snippet.get("channelId"),
+            title=snippet.get("title"),
+            description=snippet.get("description"),
+            scheduled_start_time=_iso_or_none(snippet.get("scheduledStartTime")),
+            scheduled_end_time=_iso_or_none(snippet.get("scheduledEndTime")),
+            actual_start_time=_iso_or_none(snippet.get("actualStartTime")),
+            actual_end_time=_iso_or_none(snippet.get("actualEndTime")),
+            is_default_broadcast=snippet.get("isDefaultBroadcast"),
+            live_chat_id=snippet.get("liveChatId"),
+            thumbnail=snippet.get("thumbnails"),
+        )
 
-    @LazyProperty
-    def actual_end_time(self):
-        """
-        This is Property - access like an attribute
+    def __str__(self):
+        return f"<LiveBroadcast instance of stream {self.id}>"
 
-        Returns:
-            Timezone-aware datetime object or None
-        """
+    @property
+    def link(self):
+        """url of the stream"""
 
-        if self._actual_end_time:
-            return isoparse(self._actual_end_time)
-        return None
+        return f"https://www.youtube.com/watch?v={self.id}"
 
-    @LazyProperty
-    def is_live(self):
-        """
-        This is Property - access like an attribute
+    @property
+    def link_short(self):
+        """short url of the stream (youtu.be)"""
 
-        Returns:
-            True if stream is currently live.
-        """
+        return f"https://youtu.be/{self.id}"
+
+    @property
+    def is_live(self):
+        """True if stream is currently live."""
 
         return self.life_cycle_status == "live"
 
@@ -256,46 +320,89 @@ class LiveBroadcast:
 
         table = ("default", "medium", "high", "standard", "maxres")
 
-        return self._thumbnail[table[quality]]["url"]
+        return self.thumbnail[table[quality]]["url"]
 
     def as_dict(self):
-        return {k: v for k, v in inspect.getmembers(self)}
-
-
+        return {
+            "kind": self.kind,
+            "etag": self.etag,
+            "id": self.id,
+            "life_cycle_status": self.life_cycle_status,
+            "privacy_status": self.privacy_status,
+            "recording_status": self.recording_status,
+            "made_for_kids": self.made_for_kids,
+            "self_declared_made_for_kids": self.self_declared_made_for_kids,
+            "published_at": self.published_at,
+            "channel_id": self.channel_id,
+            "title": self.title,
+            "description": self.description,
+            "scheduled_start_time": self.scheduled_start_time,
+            "scheduled_end_time": self.scheduled_end_time,
+            "actual_start_time": self.actual_start_time,
+            "actual_end_time": self.actual_end_time,
+            "is_default_broadcast": self.is_default_broadcast,
+            "live_chat_id": self.live_chat_id,
+            "link": self.link,
+            "link_short": self.link_short,
+            "is_live": self.is_live,
+        }
+
+
+@dataclass(slots=True)
 class Video:
-    def __init__(self, dict_: dict):
-        self.json = dict_
-
+    json: dict = field(repr=False)
+    title: str
+    description: str
+    channel_title: str
+    channel_id: str
+    published_at: Optional[IsoDateTime]
+    video_id: str
+    live_content: str
+    thumbnail: dict = field(repr=False)
+    view_count: Union[None, int] = None
+    like_count: Union[None, int] = None
+    privacy_status: Optional[str] = None
+    scheduled_start_time: Optional[IsoDateTime] = None
+    actual_start_time: Optional[IsoDateTime] = None
+
+    @classmethod
+    def from_json(cls, dict_: dict) -> "Video":
         snippet = dict_["snippet"]
 
-        self.title = snippet["title"]
-        self.description = snippet["description"]
-        self.channel_title = snippet["channelTitle"]
-        self.channel_id = snippet["channelId"]
-        self.published_at = snippet["publishedAt"]
-
         try:
-            self.video_id = snippet["resourceId"]["videoId"]
+            video_id = snippet["resourceId"]["videoId"]
         except KeyError:
-            self.video_id = dict_["id"]
+            video_id = dict_["id"]
+
+        video = cls(
+            json=dict_,
+            title=snippet["title"],
+            description=snippet["description"],
+            channel_title=snippet["channelTitle"],
+            channel_id=snippet["channelId"],
+            published_at=_iso_or_none(snippet["publishedAt"]),
+            video_id=video_id,
+            live_content=snippet.get("liveBroadcastContent", ""),
+            thumbnail=snippet["thumbnails"],
+        )
 
-        try:
-            self.live_content = snippet["liveBroadcastContent"]
-        except KeyError:
-            self.live_content = ""
+        if "statistics" in dict_.keys():
+            video.view_count = dict_["statistics"]["viewCount"]
+            video.like_count = dict_["statistics"]["likeCount"]
 
-        self._thumbnail = snippet["thumbnails"]
+        if "status" in dict_.keys():
+            video.privacy_status = dict_["status"].get("privacyStatus")
 
-        self.view_count: Union[None, int] = None
-        self.like_count: Union[None, int] = None
+        if "liveStreamingDetails" in dict_.keys():
+            details = dict_["liveStreamingDetails"]
+            video.scheduled_start_time = _iso_or_none(details.get("scheduledStartTime"))
+            video.actual_start_time = _iso_or_none(details.get("actualStartTime"))
 
-        if "statistics" in dict_.keys():
-            self.view_count = dict_["statistics"]["viewCount"]
-            self.like_count = dict_["statistics"]["likeCount"]
+        return video
 
     @property
     def pub_date(self):
-        return isoparse(self.published_at)
+        return self.published_at.parse()
 
     @property
     def is_upcoming(self):
@@ -310,7 +417,23 @@ class Video:
 
         table = ("default", "medium", "high", "standard", "maxres")
 
-        return self._thumbnail[table[quality]]["url"]
+        return self.thumbnail[table[quality]]["url"]
+
+    def as_dict(self):
+        return {
+            "title": self.title,
+            "description": self.description,
+            "channel_title": self.channel_title,
+            "channel_id": self.channel_id,
+            "published_at": self.published_at,
+            "video_id": self.video_id,
+            "live_content": self.live_content,
+            "view_count": self.view_count,
+            "like_count": self.like_count,
+            "privacy_status": self.privacy_status,
+            "scheduled_start_time": self.scheduled_start_time,
+            "actual_start_time": self.actual_start_time,
+        }
 
 
 class YoutubeClient:
@@ -338,16 +461,16 @@ class YoutubeClient:
         )
         resp = req.execute()
 
-        return tuple(map(Video, resp["items"]))
+        return tuple(map(Video.from_json, resp["items"]))
 
-    def get_videos_info(self, *video_ids) -> Tuple[Video, ...]:
+    def get_videos_info(
+        self, *video_ids, part="snippet,contentDetails,statistics"
+    ) -> Tuple[Video, ...]:
 
-        req = self.video_api.list(
-            part="snippet,contentDetails,statistics", id=",".join(video_ids)
-        )
+        req = self.video_api.list(part=part, id=",".join(video_ids))
         resp = req.execute()
 
-        return tuple(map(Video, resp["items"]))
+        return tuple(map(Video.from_json, resp["items"]))
 
     def get_stream_status(self, video_id) -> str:
         # This is most inefficient out of these methods.. but it's way simpler than first code.
@@ -407,7 +530,9 @@ class YoutubeClient:
 
         resp = req.execute()
         return tuple(
-            vid_info for vid_info in map(Video, resp["items"]) if vid_info.is_upcoming
+            vid_info
+            for vid_info in map(Video.from_json, resp["items"])
+            if vid_info.is_upcoming
         )
 
     def get_live_streams(self, channel_id: str) -> Tuple[Video, ...]:
@@ -418,7 +543,9 @@ class YoutubeClient:
 
         resp = req.execute()
         return tuple(
-            vid_info for vid_info in map(Video, resp["items"]) if vid_info.is_live
+            vid_info
+            for vid_info in map(Video.from_json, resp["items"])
+            if vid_info.is_live
         )
 
     def get_start_time(self, video_id) -> datetime.datetime:
@@ -453,15 +580,39 @@ class YoutubeClient:
         )
 
         resp = req.execute()
-        return tuple(map(LiveStream, resp["items"]))
+        return tuple(map(LiveStream.from_json, resp["items"]))
+
+    def _execute_conditional(self, req):
+        """
+        Executes request with the ETag of its last response.
+
+        Raises:
+            NotModified: Response did not change since then.
+        """
+
+        # Different accounts may make the same request
+        key = f"youtube:{id(self.credential)}:{req.uri}"
+        req.headers.update(validator_cache.headers(key))
+
+        try:
+            resp = req.execute()
+        except googleapiclient.errors.HttpError as e:
+            if e.resp.status == 304:
+                raise validator_cache.not_modified(key)
+            raise
+
+        validator_cache.store(key, resp.get("etag"), len(json.dumps(resp)))
+        return resp
 
-    def _get_user_broadcasts(self, status, max_results):
+    def _get_user_broadcasts(self, status, max_results, conditional=False):
         """
         Gets authorized user's broadcasts.
 
         Args:
             status: Status to filter with. Supported: "active/all/completed/upcoming/
             max_results: Maximum number of results to get.
+            conditional: Raise NotModified if the response did not change since the
+                last conditional call.
 
         Returns:
             Tuple of LiveStream objects if any. Else returns None.
@@ -474,21 +625,25 @@ class YoutubeClient:
             maxResults=max_results,
         )
 
-        resp = req.execute()
-        return tuple(map(LiveBroadcast, resp["items"]))
+        resp = self._execute_conditional(req) if conditional else req.execute()
+        return tuple(map(LiveBroadcast.from_json, resp["items"]))
 
-    def get_active_user_broadcasts(self, max_results=10):
+    def get_active_user_broadcasts(self, max_results=10, conditional=False):
         """
         Gets authorized user's active broadcasts.
 
         Args:
             max_results: Maximum number of results to get.
+            conditional: Raise NotModified if the response did not change since the
+                last conditional call.
 
         Returns:
             Tuple of LiveStream objects if any. Else returns None.
         """
 
-        return self._get_user_broadcasts(status="active", max_results=max_results)
+        return self._get_user_broadcasts(
+            status="active", max_results=max_results, conditional=conditional
+        )
 
     def get_all_user_broadcasts(self, max_results=10):
         """
@@ -528,3 +683,85 @@ class YoutubeClient:
         """
 
         return self._get_user_broadcasts(status="upcoming", max_results=max_results)
+
+
+def _awaitable(name):
+    async def method(self, *args, **kwargs):
+        return await self._run(name, *args, **kwargs)
+
+    method.__name__ = name
+    method.__doc__ = f"Awaitable version of YoutubeClient.{name}."
+    return method
+
+
+class AsyncYoutubeClient:
+    """
+    Runs YoutubeClient methods in a bounded thread pool.
+
+    httplib2 is not thread-safe, so every worker thread builds its own YoutubeClient.
+    """
+
+    def __init__(
+        self,
+        factory: Callable[[], YoutubeClient],
+        max_workers=2,
+        timeout=30,
+        credentials: Optional[CredentialManager] = None,
+    ):
+        self.factory = factory
+        self.timeout = timeout
+        self.credentials = credentials
+        self.executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="youtube-api"
+        )
+        self._local = threading.local()
+
+    def _call(self, name, *args, **kwargs):
+        client = getattr(self._local, "client", None)
+        if client is None:
+            client = self._local.client = self.factory()
+        return getattr(client, name)(*args, **kwargs)
+
+    async def _run(self, name, *args, **kwargs):
+        if self.credentials is None:
+            return await self._run_in_executor(name, *args, **kwargs)
+
+        # Retried once with a new token if the token got rejected
+        for retry in (True, False):
+            token = await self.credentials.get()
+            try:
+                return await self._run_in_executor(name, *args, **kwargs)
+            except googleapiclient.errors.HttpError as e:
+                if e.resp.status != 401 or not retry:
+                    raise
+            await self.credentials.invalidate(token)
+
+    async def _run_in_executor(self, name, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        future = loop.run_in_executor(
+            self.executor, partial(self._call, name, *args, **kwargs)
+        )
+        # Cancelling (or timing out) drops the call if it hasn't started yet
+        return await asyncio.wait_for(future, self.timeout)
+
+    revoke_token = _awaitable("revoke_token")
+    get_latest_videos = _awaitable("get_latest_videos")
+    get_videos_info = _awaitable("get_videos_info")
+    get_stream_status = _awaitable("get_stream_status")
+    get_video_title = _awaitable("get_video_title")
+    get_video_description = _awaitable("get_video_description")
+    get_channel_id = _awaitable("get_channel_id")
+    get_subscribers_count = _awaitable("get_subscribers_count")
+    get_upcoming_streams = _awaitable("get_upcoming_streams")
+    get_live_streams = _awaitable("get_live_streams")
+    get_start_time = _awaitable("get_start_time")
+    get_user_livestream = _awaitable("get_user_livestream")
+    get_active_user_broadcasts = _awaitable("get_active_user_broadcasts")
+    get_all_user_broadcasts = _awaitable("get_all_user_broadcasts")
+    get_completed_user_broadcasts = _awaitable("get_completed_user_broadcasts")
+    get_upcoming_user_broadcasts = _awaitable("get_upcoming_user_broadcasts")
+
+    async def close(self):
+        if self.credentials is not None:
+            await self.credentials.close()
+        self.executor.shutdown(wait=False, cancel_futures=True)
@@ -2,6 +2,7 @@ import argparse
 import asyncio
 
 from . import StreamNotifier
+from .sharding import parse_shard
 
 
 def stream_notifier_cli():
@@ -21,6 +22,47 @@ def stream_notifier_cli():
         default="cache",
         help="Directory where cache files will be. Default path is 'cache' on the working directory",
     )
+    parser.add_argument(
+        "--state-db",
+        metavar="STATE_DB",
+        default=None,
+        help="Keep state of all checkers in this SQLite database instead of cache files. "
+        "Existing cache files in CACHE_DIR are imported on startup.",
+    )
+    parser.add_argument(
+        "--cache-flush-interval",
+        metavar="SECONDS",
+        type=float,
+        default=5,
+        help="How often changed cache entries are written to disk. Default is 5 seconds.",
+    )
+    parser.add_argument(
+        "--shard",
+        metavar="K/N",
+        type=parse_shard,
+        default=None,
+        help="Only run the checkers assigned to the K-th of N instances sharing this config.",
+    )
+    parser.add_argument(
+        "--leader-lease",
+        metavar="PATH",
+        default=None,
+        help="Run as one of several replicas sharing the lease at PATH, only the leader pushes.",
+    )
+    parser.add_argument(
+        "--leader-backend",
+        choices=["file", "sqlite"],
+        default="file",
+        help="How the leader lease is stored. Default is file.",
+    )
+    parser.add_argument(
+        "--leader-ttl",
+        metavar="SECONDS",
+        type=float,
+        default=15,
+        help="Lease duration, a standby takes over at most about 4/3 of it after the leader stops. "
+        "Default is 15 seconds.",
+    )
     parser.add_argument(
         "-t",
         "--test",
@@ -36,6 +78,49 @@ def stream_notifier_cli():
     parser.add_argument(
         "--no-cache", action="store_true", help="Do not use cache file."
     )
+    parser.add_argument(
+        "--listen",
+        metavar="HOST:PORT",
+        default="127.0.0.1:8080",
+        help="Address of the built-in HTTP server for webhooks. Default is 127.0.0.1:8080",
+    )
+    parser.add_argument(
+        "--metrics",
+        action="store_true",
+        help="Serve Prometheus metrics at /metrics on the built-in HTTP server.",
+    )
+    parser.add_argument(
+        "--jitter",
+        metavar="FRACTION",
+        type=float,
+        default=0,
+        help="Delay each check by a random fraction of its interval, up to FRACTION. Default is 0.",
+    )
+    parser.add_argument(
+        "--spread",
+        action="store_true",
+        help="Spread the checks of all checkers across their interval instead of running them together. "
+        "Twitch checkers sharing credentials batch better without it.",
+    )
+    parser.add_argument(
+        "--push-concurrency",
+        metavar="N",
+        type=int,
+        default=8,
+        help="Maximum number of push destinations notified at the same time. Default is 8.",
+    )
+    parser.add_argument(
+        "--push-retries",
+        metavar="N",
+        type=int,
+        default=8,
+        help="Times a failed push is retried, with exponential backoff, before giving up. "
+        "Default is 8.",
+    )
     args = parser.parse_args()
     stream_notifier_instance = StreamNotifier(args)
-    asyncio.run(stream_notifier_instance.start())
+    try:
+        asyncio.run(stream_notifier_instance.start())
+    except asyncio.CancelledError:
+        # Stopped by SIGTERM, after shutting down cleanly
+        pass
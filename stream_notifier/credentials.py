@@ -0,0 +1,95 @@
+"""
+Access tokens refreshed in the background, ahead of their expiry.
+"""
+
+import asyncio
+import random
+import time
+from typing import Awaitable, Callable, Optional
+
+from loguru import logger
+
+# Tokens are refreshed when 10-25% of their lifetime is left
+REFRESH_LEFT = (0.10, 0.25)
+RETRY_DELAY = 5
+MAX_RETRY_DELAY = 300
+
+
+class CredentialManager:
+    """Keeps the token of one credential set fresh.
+
+    refresher() fetches a new token and returns (token, expiry as epoch seconds,
+    or None if it doesn't expire). Only a missing or expired token is fetched
+    while a request waits for it, everything else happens in the background."""
+
+    def __init__(
+        self,
+        name: str,
+        refresher: Callable[[], Awaitable[tuple[str, Optional[float]]]],
+        token: Optional[str] = None,
+        expires_at: Optional[float] = None,
+    ):
+        self.name = name
+        self.refresher = refresher
+        self.token = token
+        self.expires_at = expires_at
+        self.issued_at = time.time()
+
+        self.lock = asyncio.Lock()
+        self.task: Optional[asyncio.Task] = None
+
+    @property
+    def expired(self):
+        return self.expires_at is not None and time.time() >= self.expires_at
+
+    async def get(self) -> str:
+        if self.token is None or self.expired:
+            async with self.lock:
+                # Another request may have refreshed it while we were waiting
+                if self.token is None or self.expired:
+                    await self.refresh()
+
+        if self.task is None:
+            self.task = asyncio.create_task(self.run())
+        return self.token
+
+    async def invalidate(self, token: str):
+        """Refresh after token got rejected, once for every request rejecting it."""
+
+        async with self.lock:
+            if token == self.token:
+                logger.warning("Token of {} was rejected, refreshing", self.name)
+                await self.refresh()
+
+    async def refresh(self):
+        # Both are replaced together, requests never see a mismatched pair
+        self.token, self.expires_at = await self.refresher()
+        self.issued_at = time.time()
+        logger.debug("Refreshed token of {}", self.name)
+
+    async def run(self):
+        retry_delay = RETRY_DELAY
+        while self.expires_at is not None:
+            lifetime = self.expires_at - self.issued_at
+            refresh_at = self.expires_at - lifetime * random.uniform(*REFRESH_LEFT)
+            await asyncio.sleep(max(refresh_at - time.time(), 0))
+
+            try:
+                async with self.lock:
+                    await self.refresh()
+            except Exception:
+                # The current token stays in use until it actually expires
+                logger.exception(
+                    "Failed to refresh token of {}, retrying in {} seconds",
+                    self.name,
+                    retry_delay,
+                )
+                await asyncio.sleep(retry_delay)
+                retry_delay = min(retry_delay * 2, MAX_RETRY_DELAY)
+            else:
+                retry_delay = RETRY_DELAY
+
+    async def close(self):
+        if self.task is not None:
+            self.task.cancel()
+            self.task = None
@@ -0,0 +1,91 @@
+"""
+Process-wide aiohttp session, so outgoing requests share one keep-alive pool,
+and the ETags of conditional requests.
+"""
+
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+from aiohttp import ClientSession, ClientTimeout
+from loguru import logger
+
+_session: Optional[ClientSession] = None
+
+
+def get_session() -> ClientSession:
+    global _session
+
+    # Session has to be created inside a running event loop
+    if _session is None or _session.closed:
+        _session = ClientSession(timeout=ClientTimeout(total=30))
+    return _session
+
+
+async def close_session():
+    global _session
+
+    if _session is not None:
+        await _session.close()
+        _session = None
+
+
+class NotModified(Exception):
+    """The resource did not change since the last response (HTTP 304)."""
+
+
+class ValidatorCache:
+    """Remembers the ETag of the last full response to each request.
+
+    Counts conditional requests answered with 304 (hits) or a full response
+    (misses), and the response bytes hits didn't download and parse.
+    Used from API client worker threads as well."""
+
+    def __init__(self, max_entries: int = 1024):
+        self.max_entries = max_entries
+        # key -> (etag, size of the full response)
+        self.entries: OrderedDict[str, tuple[str, int]] = OrderedDict()
+        self.lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.bytes_saved = 0
+
+    def headers(self, key: str) -> dict[str, str]:
+        with self.lock:
+            entry = self.entries.get(key)
+        return {"If-None-Match": entry[0]} if entry else {}
+
+    def store(self, key: str, etag: Optional[str], size: int):
+        with self.lock:
+            self.misses += 1
+            if not etag:
+                self.entries.pop(key, None)
+                return
+
+            self.entries[key] = (etag, size)
+            self.entries.move_to_end(key)
+            if len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def not_modified(self, key: str) -> NotModified:
+        """Count a 304 response to key, returns the exception to raise."""
+
+        with self.lock:
+            self.hits += 1
+            entry = self.entries.get(key)
+            if entry:
+                self.bytes_saved += entry[1]
+                self.entries.move_to_end(key)
+
+        logger.debug("Not modified: {} ({})", key, self)
+        return NotModified(key)
+
+    def __str__(self):
+        return (
+            f"{self.hits} hits, {self.misses} misses, "
+            f"{self.bytes_saved} bytes not downloaded"
+        )
+
+
+validator_cache = ValidatorCache()
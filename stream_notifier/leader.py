@@ -0,0 +1,271 @@
+"""
+Leader election between replicas running the same config.
+
+Only the leader sends pushes and reports. Standby replicas keep polling so their
+caches stay warm, and take over once the lease of the leader has expired, at most
+about ttl * 4/3 seconds after it stopped renewing. Every event is claimed under a
+key shared by all replicas before it is pushed, so it is pushed at most once.
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import pathlib
+import secrets
+import socket
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+from loguru import logger
+
+# Claims older than this are removed when a replica becomes the leader
+CLAIM_RETENTION = 7 * 24 * 3600
+
+
+class Leader:
+    """Without replicas, the only instance is always the leader."""
+
+    def __init__(self):
+        self.elected_callbacks = []
+        self.tasks = set()
+
+    @property
+    def is_leader(self):
+        return True
+
+    def on_elected(self, callback):
+        """Register a coroutine function to run whenever this replica becomes leader."""
+
+        self.elected_callbacks.append(callback)
+
+    async def claim(self, key: str) -> bool:
+        """Claim the right to push an event, False if any replica already did."""
+
+        return True
+
+    async def renew(self):
+        pass
+
+    async def run(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class LeaseLeader(Leader):
+    """Leader while holding a lease that is renewed every ttl/3 seconds.
+
+    Subclasses implement the lease and claims on a backend shared by all replicas."""
+
+    def __init__(self, ttl: float = 15):
+        super().__init__()
+        self.ttl = ttl
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{secrets.token_hex(4)}"
+        # Monotonic deadline of the lease as last renewed
+        self.expires = 0
+        # Serializes backend access from worker threads
+        self.lock = threading.Lock()
+
+    def try_acquire(self, now: float) -> bool:
+        raise NotImplementedError()
+
+    def try_claim(self, key: str, now: float) -> bool:
+        raise NotImplementedError()
+
+    def prune_claims(self, before: float):
+        pass
+
+    def release(self):
+        raise NotImplementedError()
+
+    @property
+    def is_leader(self):
+        return time.monotonic() < self.expires
+
+    async def claim(self, key: str) -> bool:
+        try:
+            return await asyncio.to_thread(self.try_claim, key, time.time())
+        except Exception:
+            # Not pushing is the safe side, another replica may have pushed it
+            logger.exception("Failed to claim event {}", key)
+            return False
+
+    async def renew(self):
+        was_leader = self.is_leader
+        started = time.monotonic()
+        try:
+            acquired = await asyncio.to_thread(self.try_acquire, time.time())
+        except Exception:
+            # Still the leader until the current lease runs out
+            logger.exception("Failed to renew leader lease")
+            return
+
+        self.expires = started + self.ttl if acquired else 0
+
+        if acquired and not was_leader:
+            logger.info("Became the leader as {}", self.owner)
+            await asyncio.to_thread(self.prune_claims, time.time() - CLAIM_RETENTION)
+            for callback in self.elected_callbacks:
+                task = asyncio.create_task(callback())
+                self.tasks.add(task)
+                task.add_done_callback(self.tasks.discard)
+        elif was_leader and not acquired:
+            logger.warning("Lost the leader lease, standing by")
+
+    async def run(self):
+        while True:
+            await asyncio.sleep(self.ttl / 3)
+            await self.renew()
+
+    def close(self):
+        # Let a standby take over right away
+        if self.is_leader:
+            try:
+                self.release()
+            except Exception:
+                logger.exception("Failed to release leader lease")
+        self.expires = 0
+
+
+class FileLease(LeaseLeader):
+    """Lease in a JSON file guarded by flock, claims as exclusively created files.
+
+    Only works between processes on the same host (or a filesystem with working locks)."""
+
+    def __init__(self, path: pathlib.Path, ttl: float = 15):
+        super().__init__(ttl)
+        self.path = pathlib.Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.lock_path = self.path.with_name(f"{self.path.name}.lock")
+        self.claims_dir = self.path.with_name(f"{self.path.name}.claims")
+        self.claims_dir.mkdir(exist_ok=True)
+
+    @contextmanager
+    def locked(self):
+        # Unix only, imported here so the SQLite lease still works on Windows
+        import fcntl
+
+        with self.lock, open(self.lock_path, "a") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            yield
+
+    def read(self) -> dict:
+        try:
+            return json.loads(self.path.read_text())
+        except (FileNotFoundError, ValueError):
+            return {}
+
+    def write(self, lease: dict):
+        tmp = self.path.with_name(f"{self.path.name}.tmp")
+        tmp.write_text(json.dumps(lease))
+        os.replace(tmp, self.path)
+
+    def try_acquire(self, now: float) -> bool:
+        with self.locked():
+            lease = self.read()
+            if lease.get("owner", self.owner) != self.owner and lease["expires"] > now:
+                return False
+
+            self.write({"owner": self.owner, "expires": now + self.ttl})
+            return True
+
+    def release(self):
+        with self.locked():
+            if self.read().get("owner") == self.owner:
+                self.write({"owner": self.owner, "expires": 0})
+
+    def try_claim(self, key: str, now: float) -> bool:
+        name = hashlib.blake2b(key.encode(), digest_size=16).hexdigest()
+        try:
+            fd = os.open(self.claims_dir / name, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except FileExistsError:
+            return False
+
+        with os.fdopen(fd, "w") as f:
+            f.write(key)
+        return True
+
+    def prune_claims(self, before: float):
+        for path in self.claims_dir.iterdir():
+            if path.stat().st_mtime < before:
+                path.unlink(missing_ok=True)
+
+
+class SqliteLease(LeaseLeader):
+    """Lease and claims in tables of a SQLite database."""
+
+    def __init__(self, path: pathlib.Path, ttl: float = 15):
+        super().__init__(ttl)
+        self.path = pathlib.Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+
+        # Transactions are started explicitly, see transaction()
+        self.connection = sqlite3.connect(
+            self.path, timeout=ttl / 3, isolation_level=None, check_same_thread=False
+        )
+        with self.transaction():
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS lease ("
+                "name TEXT PRIMARY KEY, owner TEXT NOT NULL, expires REAL NOT NULL)"
+            )
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS claims ("
+                "key TEXT PRIMARY KEY, owner TEXT NOT NULL, claimed_at REAL NOT NULL)"
+            )
+
+    @contextmanager
+    def transaction(self):
+        with self.lock:
+            # Take the write lock up front, so the lease is read and written atomically
+            self.connection.execute("BEGIN IMMEDIATE")
+            try:
+                yield
+            except BaseException:
+                self.connection.execute("ROLLBACK")
+                raise
+            self.connection.execute("COMMIT")
+
+    def try_acquire(self, now: float) -> bool:
+        with self.transaction():
+            row = self.connection.execute(
+                "SELECT owner, expires FROM lease WHERE name = 'leader'"
+            ).fetchone()
+            if row and row[0] != self.owner and row[1] > now:
+                return False
+
+            self.connection.execute(
+                "INSERT OR REPLACE INTO lease (name, owner, expires) "
+                "VALUES ('leader', ?, ?)",
+                (self.owner, now + self.ttl),
+            )
+            return True
+
+    def release(self):
+        with self.transaction():
+            self.connection.execute(
+                "UPDATE lease SET expires = 0 WHERE name = 'leader' AND owner = ?",
+                (self.owner,),
+            )
+
+    def try_claim(self, key: str, now: float) -> bool:
+        with self.transaction():
+            cursor = self.connection.execute(
+                "INSERT OR IGNORE INTO claims (key, owner, claimed_at) VALUES (?, ?, ?)",
+                (key, self.owner, now),
+            )
+            return cursor.rowcount == 1
+
+    def prune_claims(self, before: float):
+        with self.transaction():
+            self.connection.execute("DELETE FROM claims WHERE claimed_at < ?", (before,))
+
+    def close(self):
+        super().close()
+        self.connection.close()
+
+
+LEASE_BACKENDS = {"file": FileLease, "sqlite": SqliteLease}
@@ -1,31 +1,101 @@
 import asyncio
-import pathlib
+import signal
 
 from loguru import logger
 from yaml import safe_load
 
+from .cache import CacheStore, JsonCacheStore, SqliteCacheStore
 from .checkers import StreamChecker
+from .http import close_session, validator_cache
+from .leader import LEASE_BACKENDS, Leader
+from .metrics import handle_metrics
+from .outbox import Outbox
+from .scheduler import Scheduler
+from .server import server
+from .sharding import shard_name, shard_of, shard_path
+from .timing import startup_timer
 from .PushMethod import Push
 
 
 class StreamNotifier:
     def __init__(self, args):
         # Load the config meow meow
-        with open(args.path, encoding="utf8") as f:
-            config = safe_load(f)
+        with startup_timer.measure("load config"):
+            with open(args.path, encoding="utf8") as f:
+                config = safe_load(f)
 
         # Create push methods
         push_config = config.pop("push methods", {})
-        self.push = Push(push_config, test_mode=args.test)
+        with startup_timer.measure("create push methods"):
+            self.push = Push(
+                push_config,
+                test_mode=args.test,
+                max_concurrency=args.push_concurrency,
+            )
         self.push_test = args.push_test
+        self.listen = args.listen
+        if args.metrics:
+            server.add_route("GET", "/metrics", handle_metrics)
+        self.scheduler = Scheduler(jitter=args.jitter, spread=args.spread)
+
+        if args.no_cache:
+            self.store = CacheStore()
+        elif args.state_db:
+            # Shards share the store, checker state is keyed by the unique checker
+            # name, so it stays put when checkers move between shards
+            self.store = SqliteCacheStore(
+                args.state_db, flush_interval=args.cache_flush_interval
+            )
+            # Carry over state from the JSON cache files, if any
+            imported = self.store.import_json(args.cache_dir)
+            if imported:
+                logger.info(
+                    "Imported {} cache files from {} into {}",
+                    imported,
+                    args.cache_dir,
+                    args.state_db,
+                )
+        else:
+            self.store = JsonCacheStore(
+                args.cache_dir, flush_interval=args.cache_flush_interval
+            )
+
+        # Replicas sharing a lease take turns, only the leader pushes
+        if args.leader_lease:
+            lease_path = args.leader_lease
+            if args.shard:
+                lease_path = shard_path(lease_path, args.shard)
+            lease_cls = LEASE_BACKENDS[args.leader_backend]
+            self.leader = lease_cls(lease_path, ttl=args.leader_ttl)
+        else:
+            self.leader = Leader()
+
+        # Pushes are stored before they are sent, and retried until delivered
+        self.outbox = Outbox(
+            self.push,
+            self.store,
+            leader=self.leader,
+            namespace=shard_name(args.shard) if args.shard else "main",
+            retries=args.push_retries,
+        )
+        self.leader.on_elected(self.outbox.reload)
+        self.leader.on_elected(self.push_deferred)
 
         # Initialize stream checkers
         self.checkers = set()
         for name, service_config in config.items():
-            cache_file = None
-            if not args.no_cache:
-                cache_file = pathlib.Path(args.cache_dir) / f"cache-{name}.json"
-            checker = StreamChecker(service_config, self.push, cache_file)
+            if args.shard and shard_of(name, args.shard[1]) != args.shard[0]:
+                continue
+
+            with startup_timer.measure(f"create checker {name}"):
+                checker = StreamChecker(
+                    name,
+                    service_config,
+                    self.push,
+                    self.store,
+                    leader=self.leader,
+                    outbox=self.outbox,
+                )
             logger.info(
                 "Loaded stream checker={}, type={}, test_mode={}",
                 name,
@@ -34,17 +104,73 @@ class StreamNotifier:
             )
             self.checkers.add(checker)
 
+        if args.shard:
+            logger.info(
+                "Shard {}/{}: running {} of {} checkers",
+                *args.shard,
+                len(self.checkers),
+                len(config),
+            )
+
+    async def push_deferred(self):
+        await asyncio.gather(*(checker.push_deferred() for checker in self.checkers))
+
     async def start(self):
         # Verify push methods
-        await self.push.verify_push()
+        with startup_timer.measure("verify push methods"):
+            await self.push.verify_push()
         method_names = ", ".join(self.push.methods.keys())
         logger.info(f"Verified push methods: {method_names}")
 
         # Push test mode: send push and exit
         if self.push_test:
+            startup_timer.report()
             destination, content = self.push_test
             await self.push.send_push({destination: content})
             await self.push.close()
+            await close_session()
             return
 
-        await asyncio.gather(*(checker.run() for checker in self.checkers))
+        # Webhook receivers need to be reachable before checkers subscribe
+        if server.has_routes:
+            host, _, port = self.listen.rpartition(":")
+            await server.start(host or "0.0.0.0", int(port))
+
+        # Stop like on Ctrl+C when the service manager or container runtime asks
+        # to, so the store is flushed and the lease released below
+        loop = asyncio.get_running_loop()
+        try:
+            loop.add_signal_handler(signal.SIGTERM, asyncio.current_task().cancel)
+        except NotImplementedError:
+            # Not available on Windows
+            pass
+
+        try:
+            await self.leader.renew()
+            with startup_timer.measure("prepare checkers"):
+                await asyncio.gather(*(checker.prepare() for checker in self.checkers))
+            startup_timer.report()
+            await asyncio.gather(*(checker.start() for checker in self.checkers))
+
+            checkers = sorted(self.checkers, key=lambda checker: checker.name)
+            for index, checker in enumerate(checkers):
+                await self.scheduler.add(checker, phase=index / len(checkers))
+
+            await asyncio.gather(
+                self.store.run(),
+                self.scheduler.run(),
+                self.leader.run(),
+                self.outbox.run(),
+            )
+        finally:
+            await server.stop()
+            self.leader.close()
+            self.store.close()
+            await asyncio.gather(*(checker.close() for checker in self.checkers))
+            await self.push.close()
+            await close_session()
+            logger.info("Conditional requests: {}", validator_cache)
+            try:
+                loop.remove_signal_handler(signal.SIGTERM)
+            except NotImplementedError:
+                pass
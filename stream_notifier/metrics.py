@@ -0,0 +1,202 @@
+"""
+Metrics in the Prometheus text exposition format, served at /metrics.
+
+Recording a sample is a dict update under a lock, cheap enough for hot paths
+and safe from API client worker threads.
+"""
+
+import bisect
+import threading
+from typing import Callable, Optional
+
+from aiohttp import web
+
+from .http import validator_cache
+
+DEFAULT_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+
+def _format_labels(names, values, extra=()) -> str:
+    pairs = [*zip(names, values), *extra]
+    if not pairs:
+        return ""
+
+    def escape(value):
+        value = str(value).replace("\\", r"\\").replace("\n", r"\n")
+        return value.replace('"', r"\"")
+
+    return "{" + ",".join(f'{name}="{escape(value)}"' for name, value in pairs) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric:
+    """Unlabeled metrics can read their value from function when exposed instead."""
+
+    type = "untyped"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labels=(),
+        function: Optional[Callable[[], float]] = None,
+    ):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(labels)
+        self.function = function
+        self.lock = threading.Lock()
+        self.values: dict[tuple, object] = {}
+        METRICS.append(self)
+
+    def key(self, labels: dict) -> tuple:
+        return tuple(str(labels[name]) for name in self.label_names)
+
+    def samples(self):
+        """(suffix, label values, extra labels, value) of every sample."""
+
+        if self.function is not None:
+            return [("", (), (), self.function())]
+
+        with self.lock:
+            return [("", key, (), value) for key, value in self.values.items()]
+
+    def expose(self) -> str:
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.type}",
+        ]
+        for suffix, key, extra, value in self.samples():
+            labels = _format_labels(self.label_names, key, extra)
+            lines.append(f"{self.name}{suffix}{labels} {_format_value(value)}")
+        return "\n".join(lines)
+
+
+class Counter(Metric):
+    type = "counter"
+
+    def inc(self, amount: float = 1, **labels):
+        key = self.key(labels)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+
+class Gauge(Metric):
+    type = "gauge"
+
+    def set(self, value: float, **labels):
+        with self.lock:
+            self.values[self.key(labels)] = value
+
+
+class Histogram(Metric):
+    type = "histogram"
+
+    def __init__(
+        self, name: str, documentation: str, labels=(), buckets=DEFAULT_BUCKETS
+    ):
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels):
+        key = self.key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self.lock:
+            entry = self.values.get(key)
+            if entry is None:
+                # Per bucket counts (not cumulative, plus +Inf), sum
+                entry = self.values[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            entry[0][index] += 1
+            entry[1] += value
+
+    def samples(self):
+        with self.lock:
+            values = [
+                (key, list(counts), total)
+                for key, (counts, total) in self.values.items()
+            ]
+
+        samples = []
+        for key, counts, total in values:
+            cumulative = 0
+            for bound, count in zip((*self.buckets, float("inf")), counts):
+                cumulative += count
+                le = (("le", _format_value(bound)),)
+                samples.append(("_bucket", key, le, cumulative))
+            samples.append(("_sum", key, (), total))
+            samples.append(("_count", key, (), cumulative))
+        return samples
+
+
+METRICS: list[Metric] = []
+
+
+def expose() -> str:
+    return "\n".join(metric.expose() for metric in METRICS) + "\n"
+
+
+async def handle_metrics(request: web.Request) -> web.Response:
+    return web.Response(
+        text=expose(), content_type="text/plain", headers={"Cache-Control": "no-store"}
+    )
+
+
+CHECK_DURATION = Histogram(
+    "stream_notifier_check_duration_seconds",
+    "Duration of run_check calls.",
+    ["checker_type"],
+)
+CHECKS = Counter(
+    "stream_notifier_checks_total",
+    "Finished checks by outcome: changed, unchanged, not_modified, empty or error.",
+    ["checker", "outcome"],
+)
+CACHE_WRITES = Counter(
+    "stream_notifier_cache_writes_total",
+    "set_cache calls, by whether the stored state changed.",
+    ["checker", "changed"],
+)
+PUSH_DURATION = Histogram(
+    "stream_notifier_push_duration_seconds",
+    "Duration of sending a push to a destination.",
+    ["destination"],
+)
+PUSH_FAILURES = Counter(
+    "stream_notifier_push_failures_total",
+    "Failed pushes by destination and reason: timeout or error.",
+    ["destination", "reason"],
+)
+UPSTREAM_RESPONSES = Counter(
+    "stream_notifier_upstream_responses_total",
+    "HTTP responses from upstream APIs and push services by status code.",
+    ["service", "status"],
+)
+SCHEDULER_LAG = Histogram(
+    "stream_notifier_scheduler_lag_seconds",
+    "Delay between the deadline of a check and the start of it.",
+    buckets=(0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5),
+)
+SCHEDULER_MAX_LAG = Gauge(
+    "stream_notifier_scheduler_max_lag_seconds",
+    "Largest delay between the deadline of a check and the start of it.",
+)
+VALIDATOR_HITS = Counter(
+    "stream_notifier_conditional_hits_total",
+    "Conditional requests answered with 304 Not Modified.",
+    function=lambda: validator_cache.hits,
+)
+VALIDATOR_MISSES = Counter(
+    "stream_notifier_conditional_misses_total",
+    "Conditional requests answered with a full response.",
+    function=lambda: validator_cache.misses,
+)
+VALIDATOR_BYTES_SAVED = Counter(
+    "stream_notifier_conditional_saved_bytes_total",
+    "Response bytes not downloaded thanks to 304 Not Modified.",
+    function=lambda: validator_cache.bytes_saved,
+)
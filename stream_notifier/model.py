@@ -1,5 +1,5 @@
 from functools import reduce
-from typing import Annotated, Any, Literal
+from typing import Annotated
 
 from pydantic import AfterValidator
 from pydantic import BaseModel as PydanticBaseModel
@@ -27,13 +27,3 @@ Color = Annotated[
         )
     ),
 ]
-
-
-def from_mapping(mapping: dict[str, Any]):
-    """Construct a pydantic type from mapping.
-
-    Maps from string input (as the key) to the corresponding value."""
-
-    return Annotated[
-        Literal[tuple(mapping.keys())], AfterValidator(lambda v: mapping[v])
-    ]
@@ -0,0 +1,235 @@
+"""
+Durable outbox of push notifications.
+
+A push is stored as an outbox entry before the checker state that caused it is
+committed, then delivered to each destination by a background worker. Failed
+destinations are retried with exponential backoff, and dead-lettered after the
+configured number of retries. Entries left over from a previous run are picked up
+on startup, where only their unfinished destinations are sent again. Within a
+destination, webhooks or chats that already got the message are skipped too.
+
+Keys are namespaced by shard number, and entries are only delivered by the leader. A
+replica becoming the leader reads the entries again, to resume delivery where
+the previous leader left off.
+"""
+
+import asyncio
+import random
+import secrets
+import time
+
+from loguru import logger
+
+from .cache import CacheStore
+from .leader import Leader
+from .model import PushContext
+from .PushMethod import Push
+from .PushMethod.base import PartialPushError
+
+# Outbox entries are kept in the cache store under this prefix
+PREFIX = "outbox-"
+
+
+class Outbox:
+    def __init__(
+        self,
+        push: Push,
+        store: CacheStore,
+        leader: Leader = None,
+        namespace: str = "main",
+        retries: int = 8,
+        backoff: float = 5,
+        max_backoff: float = 1800,
+    ):
+        self.push = push
+        self.store = store
+        self.leader = leader or Leader()
+        self.prefix = f"{PREFIX}{namespace}-"
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+
+        # Entries with destinations left to deliver
+        self.entries: dict[str, dict] = {}
+        # (entry key, destination) being delivered right now
+        self.sending: set[tuple[str, str]] = set()
+        self.tasks = set()
+        self.wakeup = asyncio.Event()
+        self.save_lock = asyncio.Lock()
+
+        self.entries = self.read_entries()
+        if self.entries:
+            logger.info("Resuming delivery of {} outbox entries", len(self.entries))
+
+    def read_entries(self) -> dict[str, dict]:
+        entries = {}
+        for key in self.store.keys(self.prefix):
+            entry = self.store.refresh(key)
+            if self.is_pending(entry):
+                entries[key] = entry
+        return entries
+
+    async def reload(self):
+        """Read the entries again after becoming the leader.
+
+        The previous leader may have queued, delivered or given up on entries."""
+
+        entries = self.read_entries()
+        # Deliveries still running keep working on the entries they started with
+        for key, _ in self.sending:
+            if key in self.entries:
+                entries[key] = self.entries[key]
+
+        self.entries = entries
+        logger.info("Picked up {} outbox entries as the leader", len(entries))
+        self.wakeup.set()
+
+    @staticmethod
+    def is_pending(entry: dict) -> bool:
+        destinations = entry.get("destinations", {}).values()
+        return any(destination["state"] == "pending" for destination in destinations)
+
+    async def put(
+        self,
+        checker: str,
+        push_contents: dict[str, str],
+        context: PushContext,
+        report=(),
+        **kwargs,
+    ):
+        """Queue a push, contents are formatted like Push.send_push() does."""
+
+        errors = []
+        tasks = self.push.iter_push_tasks(push_contents, context, errors, **kwargs)
+        destinations = {
+            task.name: {
+                "text": task.content,
+                "state": "pending",
+                "attempts": 0,
+                "next_attempt": 0,
+                "error": None,
+                # Webhooks or chats of the destination that got it already
+                "targets_done": [],
+            }
+            for task in tasks
+        }
+
+        if destinations:
+            key = f"{self.prefix}{time.time_ns()}-{secrets.token_hex(4)}"
+            entry = {
+                "checker": checker,
+                "created": time.time(),
+                "type": context.type,
+                "data": context.data,
+                "report": list(report),
+                "destinations": destinations,
+            }
+            await self.store.persist(key, entry)
+            self.entries[key] = entry
+            self.wakeup.set()
+            logger.info("Queued {} for {}", key, ", ".join(destinations))
+
+        # Destinations with a broken template must not hold back the others
+        if errors:
+            raise errors[0]
+
+    async def run(self):
+        while True:
+            self.wakeup.clear()
+            if not self.leader.is_leader:
+                # Woken up by reload() once elected
+                await self.wakeup.wait()
+                continue
+
+            now = time.time()
+            wait = None
+
+            for key, entry in self.entries.items():
+                for name, destination in entry["destinations"].items():
+                    if destination["state"] != "pending" or (key, name) in self.sending:
+                        continue
+
+                    delay = destination["next_attempt"] - now
+                    if delay > 0:
+                        wait = delay if wait is None else min(wait, delay)
+                        continue
+
+                    self.sending.add((key, name))
+                    task = asyncio.create_task(self.deliver(key, name))
+                    self.tasks.add(task)
+                    task.add_done_callback(self.tasks.discard)
+
+            try:
+                await asyncio.wait_for(self.wakeup.wait(), wait)
+            except asyncio.TimeoutError:
+                pass
+
+    async def deliver(self, key: str, name: str):
+        entry = self.entries[key]
+        destination = entry["destinations"][name]
+
+        try:
+            if name not in self.push.methods:
+                raise KeyError(f"Push method {name} is not configured")
+
+            context = PushContext(type=entry["type"], data=entry["data"])
+            task = self.push.create_task(
+                name,
+                destination["text"],
+                context,
+                skip=destination.setdefault("targets_done", []),
+            )
+            await self.push.send_task(task, raise_errors=True)
+        except Exception as e:
+            if isinstance(e, PartialPushError):
+                destination["targets_done"].extend(e.done)
+
+            destination["attempts"] += 1
+            destination["error"] = f"{type(e).__name__}: {e}"
+
+            if isinstance(e, KeyError) or destination["attempts"] > self.retries:
+                destination["state"] = "dead"
+                logger.error(
+                    "Gave up on {} to {} after {} attempts",
+                    key,
+                    name,
+                    destination["attempts"],
+                )
+                await self.push.send_report(
+                    entry["report"],
+                    source=entry["checker"],
+                    title="Notification Push failed!❌",
+                    desc=f"Gave up pushing to {name} after {destination['attempts']} "
+                    f"attempts. {destination['error']}",
+                )
+            else:
+                delay = self.backoff * 2 ** (destination["attempts"] - 1)
+                delay = min(delay, self.max_backoff) * random.uniform(0.5, 1)
+                destination["next_attempt"] = time.time() + delay
+                logger.warning("Retrying {} to {} in {:.0f} seconds", key, name, delay)
+        else:
+            destination["state"] = "done"
+        finally:
+            self.sending.discard((key, name))
+
+        await self.save(key)
+        self.wakeup.set()
+
+    async def save(self, key: str):
+        # Serialized, so a stale state of the entry is never written after a newer one
+        async with self.save_lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return
+
+            if self.is_pending(entry):
+                await self.store.persist(key, entry)
+                return
+
+            del self.entries[key]
+            states = {item["state"] for item in entry["destinations"].values()}
+            if "dead" in states:
+                # Keep it as a dead letter
+                await self.store.persist(key, entry)
+            else:
+                await self.store.delete(key)
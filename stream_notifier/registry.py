@@ -0,0 +1,42 @@
+"""
+Process-wide clients shared by every checker using the same credentials.
+
+One client per credential set means one HTTP connection pool and one access
+token, no matter how many checkers use it.
+"""
+
+from typing import Any, Callable, Hashable
+
+from loguru import logger
+
+
+class ClientRegistry:
+    """Reference counted clients by key, closed when the last user releases them."""
+
+    def __init__(self):
+        # key -> [client, reference count]
+        self.entries: dict[Hashable, list] = {}
+
+    def acquire(self, key: Hashable, factory: Callable[[], Any]):
+        """Get the client of key, created with factory() by the first caller."""
+
+        entry = self.entries.get(key)
+        if entry is None:
+            entry = self.entries[key] = [factory(), 0]
+            logger.debug("Created shared client {}", type(entry[0]).__name__)
+
+        entry[1] += 1
+        return entry[0]
+
+    async def release(self, key: Hashable):
+        entry = self.entries.get(key)
+        if entry is None:
+            return
+
+        entry[1] -= 1
+        if entry[1] <= 0:
+            del self.entries[key]
+            await entry[0].close()
+
+
+registry = ClientRegistry()
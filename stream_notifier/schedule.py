@@ -0,0 +1,75 @@
+"""
+Adaptive polling intervals from known stream start times.
+
+Checkers poll at min_interval around an expected start and back off towards
+max_interval when nothing is expected soon.
+"""
+
+import datetime
+from typing import Iterable, Literal
+from zoneinfo import ZoneInfo
+
+from pydantic import Field, model_validator
+
+from stream_notifier.model import BaseModel
+
+WEEKDAYS = ("mon", "tue", "wed", "thu", "fri", "sat", "sun")
+
+
+class WeeklySlot(BaseModel):
+    day: Literal[WEEKDAYS]
+    time: datetime.time
+    timezone: str = "UTC"
+
+    def occurrences(self, now: datetime.datetime):
+        """Occurrences of this slot in the weeks before, of and after now."""
+
+        tz = ZoneInfo(self.timezone)
+        local = now.astimezone(tz)
+        monday = local.date() - datetime.timedelta(days=local.weekday())
+        day = monday + datetime.timedelta(days=WEEKDAYS.index(self.day))
+
+        for weeks in (-1, 0, 1):
+            date = day + datetime.timedelta(weeks=weeks)
+            yield datetime.datetime.combine(date, self.time, tzinfo=tz)
+
+
+class AdaptiveSchedule(BaseModel):
+    min_interval: float = Field(gt=0)
+    max_interval: float = Field(gt=0)
+    weekly: list[WeeklySlot] = Field(default_factory=list)
+    # Poll at min_interval from lead_time before an expected start until grace_time after
+    lead_time: float = Field(600, ge=0)
+    grace_time: float = Field(3600, ge=0)
+
+    @model_validator(mode="after")
+    def check_intervals(self):
+        if self.min_interval > self.max_interval:
+            raise ValueError(
+                f"min interval ({self.min_interval}) is greater than "
+                f"max interval ({self.max_interval})"
+            )
+        return self
+
+    def interval(
+        self, now: datetime.datetime, starts: Iterable[datetime.datetime] = ()
+    ) -> float:
+        starts = list(starts)
+        for slot in self.weekly:
+            starts.extend(slot.occurrences(now))
+
+        next_window = None
+        for start in starts:
+            until = (start - now).total_seconds()
+            if -self.grace_time <= until <= self.lead_time:
+                return self.min_interval
+
+            if until > self.lead_time:
+                wait = until - self.lead_time
+                next_window = wait if next_window is None else min(next_window, wait)
+
+        if next_window is None:
+            return self.max_interval
+
+        # Sleep no longer than needed to be polling fast when the window opens
+        return min(self.max_interval, max(self.min_interval, next_window))
@@ -0,0 +1,129 @@
+"""
+Central scheduler running every checker at fixed-rate deadlines.
+
+Deadlines advance by whole intervals from the previous deadline, so the period
+doesn't drift with check or push time. A check still running at its next
+deadline makes that run skipped instead of queued.
+"""
+
+import asyncio
+import heapq
+import itertools
+import random
+import time
+from typing import Optional
+
+from loguru import logger
+
+from stream_notifier.metrics import SCHEDULER_LAG, SCHEDULER_MAX_LAG
+
+
+class Job:
+    def __init__(self, checker, base: float):
+        self.checker = checker
+        self.base = base
+        self.generation = 0
+        self.task: Optional[asyncio.Task] = None
+        self.rerun = False
+        self.skipped = 0
+
+
+class Scheduler:
+    def __init__(self, jitter: float = 0, spread: bool = False):
+        # Random delay added to each deadline, as a fraction of the interval
+        self.jitter = jitter
+        # Spread the first deadline of every checker across its interval
+        self.spread = spread
+
+        self.jobs: dict = {}
+        self.heap = []
+        self.counter = itertools.count()
+        self.wakeup = asyncio.Event()
+
+        self.last_lag = 0.0
+        self.max_lag = 0.0
+
+    def push(self, job: Job, interval: float):
+        deadline = job.base + random.uniform(0, self.jitter * interval)
+        heapq.heappush(self.heap, (deadline, next(self.counter), job.generation, job))
+        self.wakeup.set()
+
+    async def add(self, checker, phase: float = 0):
+        interval = await checker.next_interval()
+        offset = phase * interval if self.spread else 0
+        job = Job(checker, time.monotonic() + interval + offset)
+
+        self.jobs[checker] = job
+        checker.scheduler = self
+        self.push(job, interval)
+
+    def trigger(self, checker):
+        job = self.jobs[checker]
+        if job.task is not None:
+            # Run once more when the current check finishes
+            job.rerun = True
+            return
+
+        # Invalidate the pending deadline, it is rescheduled after this run
+        job.generation += 1
+        self.start(job)
+
+    def start(self, job: Job):
+        job.task = asyncio.create_task(self.execute(job))
+
+    async def execute(self, job: Job):
+        try:
+            job.rerun = True
+            while job.rerun:
+                job.rerun = False
+                await job.checker.tick()
+
+            interval = await job.checker.next_interval()
+
+            # Fixed rate: advance from the previous deadline, skipping missed ones
+            now = time.monotonic()
+            job.base += interval
+            if job.base <= now:
+                missed = int((now - job.base) // interval) + 1
+                job.skipped += missed
+                job.base += missed * interval
+                logger.debug(
+                    "Checker {} overran its interval, skipped {} run(s)",
+                    job.checker.name,
+                    missed,
+                )
+
+            self.push(job, interval)
+        finally:
+            job.task = None
+
+        # Triggered while the next deadline was being computed
+        if job.rerun:
+            self.trigger(job.checker)
+
+    async def run(self):
+        while True:
+            self.wakeup.clear()
+
+            if not self.heap:
+                await self.wakeup.wait()
+                continue
+
+            deadline, _, generation, job = self.heap[0]
+            delay = deadline - time.monotonic()
+            if delay > 0:
+                try:
+                    await asyncio.wait_for(self.wakeup.wait(), delay)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            heapq.heappop(self.heap)
+            if generation != job.generation or job.task is not None:
+                continue
+
+            self.last_lag = -delay
+            self.max_lag = max(self.max_lag, self.last_lag)
+            SCHEDULER_LAG.observe(self.last_lag)
+            SCHEDULER_MAX_LAG.set(self.max_lag)
+            self.start(job)
@@ -0,0 +1,39 @@
+"""
+Built-in HTTP server for incoming webhooks and other endpoints.
+
+Components register their routes before StreamNotifier starts; the server is only
+started when at least one route has been registered.
+"""
+
+from typing import Optional
+
+from aiohttp import web
+from loguru import logger
+
+
+class HttpServer:
+    def __init__(self):
+        self.app = web.Application()
+        self.runner: Optional[web.AppRunner] = None
+
+    @property
+    def has_routes(self):
+        return len(self.app.router.routes()) > 0
+
+    def add_route(self, method: str, path: str, handler):
+        self.app.router.add_route(method, path, handler)
+        logger.info("Registered HTTP endpoint {} {}", method, path)
+
+    async def start(self, host: str, port: int):
+        self.runner = web.AppRunner(self.app, access_log=None)
+        await self.runner.setup()
+        await web.TCPSite(self.runner, host, port).start()
+        logger.info("HTTP server listening on {}:{}", host, port)
+
+    async def stop(self):
+        if self.runner is not None:
+            await self.runner.cleanup()
+            self.runner = None
+
+
+server = HttpServer()
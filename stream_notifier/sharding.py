@@ -0,0 +1,47 @@
+"""
+Assignment of checkers to StreamNotifier instances.
+
+Uses rendezvous (highest random weight) hashing of the checker name: changing
+the shard count only moves checkers from or to the added or removed shards.
+"""
+
+import argparse
+import hashlib
+import pathlib
+
+
+def parse_shard(value: str) -> tuple[int, int]:
+    """Parse "K/N" (the K-th of N shards, counting from 1)."""
+
+    try:
+        index, count = map(int, value.split("/"))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Expected K/N, got {value!r}")
+
+    if not 1 <= index <= count:
+        raise argparse.ArgumentTypeError(f"Shard {index} is out of 1..{count}")
+
+    return index, count
+
+
+def shard_of(name: str, count: int) -> int:
+    def weight(index):
+        digest = hashlib.blake2b(f"{index}:{name}".encode(), digest_size=8).digest()
+        return int.from_bytes(digest, "big")
+
+    return max(range(1, count + 1), key=weight)
+
+
+def shard_name(shard: tuple[int, int]) -> str:
+    """Name of the K-th shard, e.g. shard-2.
+
+    Leaves out the shard count, so changing it keeps the names of existing shards."""
+
+    return f"shard-{shard[0]}"
+
+
+def shard_path(path, shard: tuple[int, int]) -> pathlib.Path:
+    """Per-shard variant of a file path, e.g. leader.lock -> leader.shard-2.lock"""
+
+    path = pathlib.Path(path)
+    return path.with_name(f"{path.stem}.{shard_name(shard)}{path.suffix}")
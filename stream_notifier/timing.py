@@ -0,0 +1,44 @@
+"""
+Timing of startup steps, such as loading the config and importing backends.
+"""
+
+import sys
+import time
+from contextlib import contextmanager
+from importlib import import_module
+
+from loguru import logger
+
+
+class StartupTimer:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.steps: list[tuple[str, float]] = []
+
+    @contextmanager
+    def measure(self, step: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.steps.append((step, time.perf_counter() - started))
+
+    def import_module(self, name: str, package: str = None):
+        """importlib.import_module(), timing the first import of each module."""
+
+        full_name = name if package is None else f"{package}{name}"
+        if full_name in sys.modules:
+            return sys.modules[full_name]
+
+        with self.measure(f"import {full_name}"):
+            return import_module(name, package)
+
+    def report(self):
+        total = time.perf_counter() - self.started
+        lines = "".join(
+            f"\n  {seconds * 1000:8.1f} ms  {step}" for step, seconds in self.steps
+        )
+        logger.info("Started in {:.1f} ms:{}", total * 1000, lines)
+
+
+startup_timer = StartupTimer()
@@ -0,0 +1,148 @@
+"""
+EventSub receiver against a local stand-in of Twitch sending signed messages.
+"""
+
+import json
+import unittest
+from datetime import datetime, timedelta, timezone
+
+from aiohttp import web
+from aiohttp.test_utils import TestClient, TestServer
+
+from stream_notifier.checkers.twitch.eventsub import EventSubReceiver, sign_payload
+
+SECRET = "0123456789abcdef"
+
+
+def now():
+    return datetime.now(timezone.utc).isoformat()
+
+
+class EventSubReceiverTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.receiver = EventSubReceiver(SECRET)
+        self.events = []
+        self.revoked = []
+        self.receiver.add_handler(
+            "1",
+            lambda *args: self.events.append(("1", *args)),
+            lambda *args: self.revoked.append(("1", *args)),
+        )
+        self.receiver.add_handler("2", lambda *args: self.events.append(("2", *args)))
+
+        app = web.Application()
+        app.router.add_post("/eventsub", self.receiver.handle)
+        self.client = TestClient(TestServer(app))
+        await self.client.start_server()
+
+    async def asyncTearDown(self):
+        await self.client.close()
+
+    async def send(
+        self, message_type, payload, message_id="m1", timestamp=None, secret=SECRET
+    ):
+        body = json.dumps(payload).encode()
+        timestamp = timestamp or now()
+        headers = {
+            "Twitch-Eventsub-Message-Id": message_id,
+            "Twitch-Eventsub-Message-Timestamp": timestamp,
+            "Twitch-Eventsub-Message-Signature": sign_payload(
+                secret, message_id, timestamp, body
+            ),
+            "Twitch-Eventsub-Message-Type": message_type,
+        }
+        return await self.client.post("/eventsub", data=body, headers=headers)
+
+    @staticmethod
+    def notification(user_id, type_="stream.online"):
+        return {
+            "subscription": {"type": type_},
+            "event": {"broadcaster_user_id": user_id, "broadcaster_user_login": "x"},
+        }
+
+    async def test_invalid_signature_is_rejected(self):
+        response = await self.send(
+            "notification", self.notification("1"), secret="wrong secret"
+        )
+
+        self.assertEqual(response.status, 403)
+        self.assertEqual(self.events, [])
+
+    async def test_missing_header_is_rejected(self):
+        response = await self.client.post("/eventsub", data=b"{}")
+
+        self.assertEqual(response.status, 400)
+
+    async def test_malformed_timestamp_is_rejected(self):
+        response = await self.send(
+            "notification", self.notification("1"), timestamp="yesterday"
+        )
+
+        self.assertEqual(response.status, 400)
+        self.assertEqual(self.events, [])
+
+    async def test_old_message_is_rejected(self):
+        sent_at = datetime.now(timezone.utc) - timedelta(minutes=11)
+        response = await self.send(
+            "notification", self.notification("1"), timestamp=sent_at.isoformat()
+        )
+
+        self.assertEqual(response.status, 403)
+
+    async def test_naive_timestamp_is_utc(self):
+        sent_at = datetime.now(timezone.utc).replace(tzinfo=None)
+        response = await self.send(
+            "notification", self.notification("1"), timestamp=sent_at.isoformat()
+        )
+
+        self.assertEqual(response.status, 204)
+        self.assertEqual(len(self.events), 1)
+
+    async def test_challenge_is_answered(self):
+        payload = {"challenge": "pogchamp", "subscription": {"type": "stream.online"}}
+        response = await self.send("webhook_callback_verification", payload)
+
+        self.assertEqual(response.status, 200)
+        self.assertEqual(await response.text(), "pogchamp")
+
+    async def test_duplicate_message_is_ignored(self):
+        first = await self.send("notification", self.notification("1"), "m1")
+        second = await self.send("notification", self.notification("1"), "m1")
+
+        self.assertEqual((first.status, second.status), (204, 204))
+        self.assertEqual(len(self.events), 1)
+
+    async def test_notification_is_dispatched_by_broadcaster(self):
+        await self.send("notification", self.notification("2"), "m1")
+        await self.send("notification", self.notification("3"), "m2")
+
+        self.assertEqual(len(self.events), 1)
+        user_id, type_, event = self.events[0]
+        self.assertEqual((user_id, type_), ("2", "stream.online"))
+        self.assertEqual(event["broadcaster_user_id"], "2")
+
+    async def test_removed_handler_gets_nothing(self):
+        handler, _ = self.receiver.handlers["1"][0]
+        self.receiver.remove_handler("1", handler)
+
+        response = await self.send("notification", self.notification("1"))
+
+        self.assertEqual(response.status, 204)
+        self.assertEqual(self.events, [])
+        self.assertNotIn("1", self.receiver.handlers)
+
+    async def test_revocation_is_dispatched_by_broadcaster(self):
+        payload = {
+            "subscription": {
+                "type": "stream.online",
+                "status": "authorization_revoked",
+                "condition": {"broadcaster_user_id": "1"},
+            }
+        }
+        response = await self.send("revocation", payload)
+
+        self.assertEqual(response.status, 204)
+        self.assertEqual(
+            self.revoked, [("1", "stream.online", "authorization_revoked")]
+        )
+        self.assertEqual(self.events, [])
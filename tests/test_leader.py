@@ -0,0 +1,55 @@
+"""
+Lease backends shared by two replicas in one process.
+"""
+
+import tempfile
+import unittest
+
+from stream_notifier.leader import FileLease, SqliteLease
+
+
+class LeaseTestMixin:
+    lease_cls = None
+    filename = None
+
+    async def asyncSetUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = f"{self.directory.name}/{self.filename}"
+        self.first = self.lease_cls(self.path)
+        self.second = self.lease_cls(self.path)
+
+    async def asyncTearDown(self):
+        self.first.close()
+        self.second.close()
+        self.directory.cleanup()
+
+    async def test_event_is_claimed_once(self):
+        self.assertTrue(await self.first.claim("checker:0:event"))
+        self.assertFalse(await self.first.claim("checker:0:event"))
+        self.assertFalse(await self.second.claim("checker:0:event"))
+        self.assertTrue(await self.second.claim("checker:0:other event"))
+
+    async def test_only_one_replica_leads(self):
+        await self.first.renew()
+        await self.second.renew()
+
+        self.assertTrue(self.first.is_leader)
+        self.assertFalse(self.second.is_leader)
+
+    async def test_standby_takes_over_released_lease(self):
+        await self.first.renew()
+        self.first.close()
+        await self.second.renew()
+
+        self.assertFalse(self.first.is_leader)
+        self.assertTrue(self.second.is_leader)
+
+
+class FileLeaseTest(LeaseTestMixin, unittest.IsolatedAsyncioTestCase):
+    lease_cls = FileLease
+    filename = "leader.lease"
+
+
+class SqliteLeaseTest(LeaseTestMixin, unittest.IsolatedAsyncioTestCase):
+    lease_cls = SqliteLease
+    filename = "leader.db"
@@ -0,0 +1,176 @@
+"""
+Outbox delivery against push methods that fail on demand.
+"""
+
+import asyncio
+import tempfile
+import unittest
+
+from stream_notifier.cache import SqliteCacheStore
+from stream_notifier.model import PushContext
+from stream_notifier.outbox import Outbox
+from stream_notifier.PushMethod import Push
+from stream_notifier.PushMethod.base import PartialPushError
+from stream_notifier.PushMethod.base import Push as PushMethod
+from stream_notifier.PushMethod.dispatch import DispatchQueue
+
+CONTEXT = PushContext(type="debug", data={"title": "hello"})
+
+
+class FakePush(PushMethod):
+    """Sends to each of its targets, failing the targets in fail."""
+
+    def __init__(self, targets=("main",)):
+        self.targets = list(targets)
+        self.fail = set()
+        self.sent = []
+        self.skipped = []
+        self.reports = []
+
+    async def send(self, content, context, skip=()):
+        self.skipped.append(list(skip))
+        done, errors = [], []
+        for target in self.targets:
+            if target in skip:
+                continue
+            if target in self.fail:
+                errors.append(RuntimeError(f"{target} is down"))
+                continue
+            self.sent.append((target, content))
+            done.append(target)
+
+        if errors and done:
+            raise PartialPushError(done, errors)
+        if errors:
+            raise errors[0]
+
+    async def report(self, title, description=None, color=None, fields=None, **kwargs):
+        self.reports.append(title)
+
+
+class OutboxTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.store = SqliteCacheStore(f"{self.directory.name}/state.db")
+        self.push = Push({})
+        self.tasks = []
+
+    async def asyncTearDown(self):
+        for task in self.tasks:
+            task.cancel()
+        await self.push.close()
+        self.store.close()
+        self.directory.cleanup()
+
+    def add_method(self, name, instance):
+        self.push.methods[name] = instance
+        self.push.comments[name] = name
+        self.push.timeouts[name] = 5
+        self.push.queues[name] = DispatchQueue(name, instance, timeout=5)
+        return instance
+
+    def start(self, outbox):
+        self.tasks.append(asyncio.create_task(outbox.run()))
+
+    @staticmethod
+    async def wait_until(condition, timeout=5):
+        async with asyncio.timeout(timeout):
+            while not condition():
+                await asyncio.sleep(0.01)
+
+    def outbox(self, store=None, **kwargs):
+        return Outbox(self.push, store or self.store, backoff=0.01, **kwargs)
+
+    async def test_delivered_entry_is_deleted(self):
+        method = self.add_method("a", FakePush())
+        outbox = self.outbox()
+        self.start(outbox)
+
+        await outbox.put("checker", {"a": "{title}!"}, CONTEXT, title="hello")
+        await self.wait_until(lambda: not self.store.keys(outbox.prefix))
+
+        self.assertEqual(method.sent, [("main", "hello!")])
+        self.assertEqual(outbox.entries, {})
+
+    async def test_failed_destination_is_retried_then_dead_lettered(self):
+        method = self.add_method("a", FakePush())
+        method.fail.add("main")
+        report = self.add_method("report", FakePush())
+        outbox = self.outbox(retries=2)
+        self.start(outbox)
+
+        await outbox.put("checker", {"a": "hello"}, CONTEXT, report=["report"])
+        (key,) = self.store.keys(outbox.prefix)
+
+        def destination():
+            return self.store.refresh(key)["destinations"]["a"]
+
+        # Kept as a dead letter once written
+        await self.wait_until(lambda: destination()["state"] == "dead")
+        await self.wait_until(lambda: report.reports)
+
+        # The first attempt and two retries
+        self.assertEqual(len(method.skipped), 3)
+        self.assertEqual(destination()["attempts"], 3)
+        self.assertEqual(outbox.entries, {})
+        self.assertEqual(report.reports, ["Notification Push failed!❌"])
+
+    async def test_partial_failure_skips_done_targets(self):
+        method = self.add_method("a", FakePush(targets=["x", "y"]))
+        method.fail.add("y")
+        outbox = self.outbox()
+        self.start(outbox)
+
+        await outbox.put("checker", {"a": "hello"}, CONTEXT)
+        await self.wait_until(lambda: len(method.skipped) == 2)
+        method.fail.clear()
+        await self.wait_until(lambda: not outbox.entries)
+
+        self.assertEqual(method.sent, [("x", "hello"), ("y", "hello")])
+        self.assertEqual(method.skipped[-1], ["x"])
+
+    async def test_pending_destinations_are_replayed_from_store(self):
+        done = self.add_method("a", FakePush())
+        pending = self.add_method("b", FakePush())
+        await self.store.persist(
+            "outbox-main-1-abcd",
+            {
+                "checker": "checker",
+                "created": 0,
+                "type": "debug",
+                "data": {},
+                "report": [],
+                "destinations": {
+                    name: {
+                        "text": "hello",
+                        "state": state,
+                        "attempts": 0,
+                        "next_attempt": 0,
+                        "error": None,
+                        "targets_done": [],
+                    }
+                    for name, state in (("a", "done"), ("b", "pending"))
+                },
+            },
+        )
+        self.store.close()
+
+        # A new process reading what the previous one left behind
+        store = SqliteCacheStore(f"{self.directory.name}/state.db")
+        self.addCleanup(store.close)
+        outbox = self.outbox(store)
+        self.assertEqual(list(outbox.entries), ["outbox-main-1-abcd"])
+
+        self.start(outbox)
+        await self.wait_until(lambda: not store.keys("outbox-"))
+
+        self.assertEqual(done.sent, [])
+        self.assertEqual(pending.sent, [("main", "hello")])
+
+    async def test_other_namespace_is_not_replayed(self):
+        self.add_method("a", FakePush())
+        outbox = self.outbox(namespace="shard-1")
+        await outbox.put("checker", {"a": "hello"}, CONTEXT)
+
+        self.assertEqual(self.outbox(namespace="shard-2").entries, {})
+        self.assertEqual(len(self.outbox(namespace="shard-1").entries), 1)
@@ -0,0 +1,169 @@
+"""
+WebSub subscriber and endpoint against a local stand-in of the hub.
+"""
+
+import unittest
+
+from aiohttp import web
+from aiohttp.test_utils import TestClient, TestServer
+
+from stream_notifier.checkers.youtube.websub import (
+    TOPIC_URL,
+    WebSubEndpoint,
+    WebSubSubscriber,
+    sign_body,
+)
+from stream_notifier.http import close_session
+
+CALLBACK_URL = "https://notifier.example/websub"
+
+
+def feed(channel_id, video_id):
+    return f"""<?xml version="1.0" encoding="UTF-8"?>
+<feed xmlns:yt="http://www.youtube.com/xml/schemas/2015"
+      xmlns="http://www.w3.org/2005/Atom">
+  <link rel="hub" href="https://pubsubhubbub.appspot.com"/>
+  <link rel="self" href="{TOPIC_URL.format(channel_id)}"/>
+  <title>YouTube video feed</title>
+  <entry>
+    <id>yt:video:{video_id}</id>
+    <yt:videoId>{video_id}</yt:videoId>
+    <yt:channelId>{channel_id}</yt:channelId>
+    <title>Live now</title>
+  </entry>
+</feed>""".encode()
+
+
+class WebSubTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        # Stand-in of the hub, recording subscription requests
+        self.hub_requests = []
+        self.hub_status = 202
+        hub = web.Application()
+        hub.router.add_post("/subscribe", self.handle_subscribe)
+        self.hub = TestClient(TestServer(hub))
+        await self.hub.start_server()
+
+        self.videos = []
+        self.endpoint = WebSubEndpoint()
+        self.subscribers = {
+            channel_id: WebSubSubscriber(
+                str(self.hub.make_url("/subscribe")),
+                TOPIC_URL.format(channel_id),
+                CALLBACK_URL,
+                lambda video_ids, channel_id=channel_id: self.videos.append(
+                    (channel_id, video_ids)
+                ),
+                secret=secret,
+            )
+            for channel_id, secret in (("UCa", None), ("UCb", "hub secret"))
+        }
+        for subscriber in self.subscribers.values():
+            self.endpoint.add(subscriber)
+
+        app = web.Application()
+        app.router.add_get("/websub", self.endpoint.handle_verify)
+        app.router.add_post("/websub", self.endpoint.handle_notify)
+        self.client = TestClient(TestServer(app))
+        await self.client.start_server()
+
+    async def asyncTearDown(self):
+        await self.client.close()
+        await self.hub.close()
+        await close_session()
+
+    async def handle_subscribe(self, request):
+        self.hub_requests.append(dict(await request.post()))
+        return web.Response(status=self.hub_status)
+
+    async def test_subscribe_sends_topic_and_secret(self):
+        await self.subscribers["UCb"].subscribe()
+
+        (data,) = self.hub_requests
+        self.assertEqual(data["hub.mode"], "subscribe")
+        self.assertEqual(data["hub.topic"], TOPIC_URL.format("UCb"))
+        self.assertEqual(data["hub.callback"], CALLBACK_URL)
+        self.assertEqual(data["hub.secret"], "hub secret")
+
+    async def test_subscribe_fails_on_hub_error(self):
+        self.hub_status = 500
+
+        with self.assertRaises(RuntimeError):
+            await self.subscribers["UCa"].subscribe()
+
+    async def test_verify_known_topic(self):
+        response = await self.client.get(
+            "/websub",
+            params={
+                "hub.mode": "subscribe",
+                "hub.topic": TOPIC_URL.format("UCa"),
+                "hub.challenge": "challenge",
+                "hub.lease_seconds": "432000",
+            },
+        )
+
+        self.assertEqual(response.status, 200)
+        self.assertEqual(await response.text(), "challenge")
+        self.assertTrue(self.subscribers["UCa"].active)
+        self.assertFalse(self.subscribers["UCb"].active)
+
+    async def test_unverified_subscription_is_inactive(self):
+        await self.subscribers["UCa"].subscribe()
+
+        self.assertFalse(self.subscribers["UCa"].active)
+
+    async def test_verify_unsubscribe(self):
+        subscriber = self.subscribers["UCa"]
+        subscriber.verified("subscribe", "432000")
+        response = await self.client.get(
+            "/websub",
+            params={
+                "hub.mode": "unsubscribe",
+                "hub.topic": TOPIC_URL.format("UCa"),
+                "hub.challenge": "challenge",
+            },
+        )
+
+        self.assertEqual(response.status, 200)
+        self.assertFalse(subscriber.active)
+
+    async def test_verify_unknown_topic(self):
+        response = await self.client.get(
+            "/websub",
+            params={"hub.topic": TOPIC_URL.format("UCz"), "hub.challenge": "x"},
+        )
+
+        self.assertEqual(response.status, 404)
+
+    async def test_notify_is_routed_by_channel(self):
+        response = await self.client.post("/websub", data=feed("UCa", "video1"))
+
+        self.assertEqual(response.status, 204)
+        self.assertEqual(self.videos, [("UCa", ["video1"])])
+
+    async def test_notify_unknown_channel_is_ignored(self):
+        response = await self.client.post("/websub", data=feed("UCz", "video1"))
+
+        self.assertEqual(response.status, 204)
+        self.assertEqual(self.videos, [])
+
+    async def test_notify_with_valid_signature(self):
+        body = feed("UCb", "video2")
+        response = await self.client.post(
+            "/websub",
+            data=body,
+            headers={"X-Hub-Signature": sign_body("hub secret", body)},
+        )
+
+        self.assertEqual(response.status, 204)
+        self.assertEqual(self.videos, [("UCb", ["video2"])])
+
+    async def test_notify_with_invalid_signature_is_ignored(self):
+        body = feed("UCb", "video2")
+        response = await self.client.post(
+            "/websub", data=body, headers={"X-Hub-Signature": "sha1=0000"}
+        )
+
+        # Hubs still expect a success response
+        self.assertEqual(response.status, 204)
+        self.assertEqual(self.videos, [])